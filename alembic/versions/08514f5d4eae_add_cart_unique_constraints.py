@@ -0,0 +1,59 @@
+"""add cart unique constraints
+
+Revision ID: 08514f5d4eae
+Revises: 56be9aa40b34
+Create Date: 2026-10-18 13:02:51.417903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '08514f5d4eae'
+down_revision: Union[str, None] = '56be9aa40b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fold duplicate carts (racing get-or-create) into each user's oldest cart
+    op.execute("""
+        UPDATE cart_items SET cart_id = keep.id
+        FROM carts c
+        JOIN (SELECT user_id, MIN(id) AS id FROM carts
+              WHERE user_id IS NOT NULL GROUP BY user_id) keep
+          ON keep.user_id = c.user_id
+        WHERE cart_items.cart_id = c.id AND c.id <> keep.id
+    """)
+    op.execute("""
+        DELETE FROM carts c
+        USING carts keep
+        WHERE keep.user_id = c.user_id AND keep.id < c.id
+    """)
+
+    # Merge duplicate (cart, product) rows, summing their quantities
+    op.execute("""
+        UPDATE cart_items SET quantity = dup.quantity
+        FROM (SELECT MIN(id) AS id, SUM(COALESCE(quantity, 1)) AS quantity
+              FROM cart_items GROUP BY cart_id, product_id
+              HAVING COUNT(*) > 1) dup
+        WHERE cart_items.id = dup.id
+    """)
+    op.execute("""
+        DELETE FROM cart_items ci
+        USING cart_items keep
+        WHERE keep.cart_id = ci.cart_id
+          AND keep.product_id = ci.product_id
+          AND keep.id < ci.id
+    """)
+
+    op.create_index(op.f('ix_carts_user_id'), 'carts', ['user_id'], unique=True)
+    op.create_unique_constraint('uq_cart_items_cart_id_product_id', 'cart_items', ['cart_id', 'product_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_cart_items_cart_id_product_id', 'cart_items', type_='unique')
+    op.drop_index(op.f('ix_carts_user_id'), table_name='carts')
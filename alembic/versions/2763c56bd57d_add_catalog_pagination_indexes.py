@@ -0,0 +1,30 @@
+"""add catalog pagination indexes
+
+Revision ID: 2763c56bd57d
+Revises: 453b8c4091f2
+Create Date: 2026-10-18 09:12:41.208311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2763c56bd57d'
+down_revision: Union[str, None] = '453b8c4091f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_category_id_id', 'products', ['category_id', 'id'], unique=False)
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False)
+    op.create_index('ix_products_category_id_price_id', 'products', ['category_id', 'price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_category_id_price_id', table_name='products')
+    op.drop_index('ix_products_price_id', table_name='products')
+    op.drop_index('ix_products_category_id_id', table_name='products')
@@ -0,0 +1,31 @@
+"""add admin order list indexes
+
+Revision ID: 56be9aa40b34
+Revises: ac9cd5fd0e93
+Create Date: 2026-10-18 12:14:38.160273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '56be9aa40b34'
+down_revision: Union[str, None] = 'ac9cd5fd0e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (status, id) also serves plain status lookups, so it replaces ix_orders_status
+    op.create_index('ix_orders_status_id', 'orders', ['status', 'id'], unique=False)
+    op.drop_index(op.f('ix_orders_status'), table_name='orders')
+    op.create_index(op.f('ix_addresses_city'), 'addresses', ['city'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_addresses_city'), table_name='addresses')
+    op.create_index(op.f('ix_orders_status'), 'orders', ['status'], unique=False)
+    op.drop_index('ix_orders_status_id', table_name='orders')
@@ -0,0 +1,48 @@
+"""add product search
+
+Revision ID: 9c4e2b7d6a15
+Revises: 5d2a8f6c1e07
+Create Date: 2026-10-18 14:52:19.336170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e2b7d6a15'
+down_revision: Union[str, None] = '5d2a8f6c1e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('search_document', sa.Text(), nullable=True))
+    op.execute("""
+        UPDATE products SET search_document =
+            name || ' ' || COALESCE(description, '') || ' ' ||
+            COALESCE((SELECT name FROM categories WHERE categories.id = products.category_id), '')
+    """)
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Expressions must match app/search.py
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_products_search_tsv ON products "
+        "USING gin (to_tsvector('simple'::regconfig, search_document))"
+    )
+    op.execute(
+        "CREATE INDEX ix_products_search_trgm ON products "
+        "USING gin (search_document gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_products_search_trgm', table_name='products')
+        op.drop_index('ix_products_search_tsv', table_name='products')
+    op.drop_column('products', 'search_document')
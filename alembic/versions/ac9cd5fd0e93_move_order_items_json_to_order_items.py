@@ -0,0 +1,160 @@
+"""move orders.items_json to order_items
+
+Revision ID: ac9cd5fd0e93
+Revises: e5f50827175a
+Create Date: 2026-10-18 11:26:52.904417
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ac9cd5fd0e93'
+down_revision: Union[str, None] = 'e5f50827175a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+orders = sa.table(
+    'orders',
+    sa.column('id', sa.Integer),
+    sa.column('items_json', sa.Text),
+)
+order_items = sa.table(
+    'order_items',
+    sa.column('id', sa.Integer),
+    sa.column('order_id', sa.Integer),
+    sa.column('product_id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('price', sa.Float),
+    sa.column('quantity', sa.Integer),
+)
+products = sa.table('products', sa.column('id', sa.Integer))
+
+
+def upgrade() -> None:
+    # The backfill below commits the DDL before alembic_version is stamped,
+    # so a re-run after an interrupted backfill finds the table already there
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('order_items'):
+        op.create_table('order_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        existing_indexes = set()
+    else:
+        existing_indexes = {i['name'] for i in inspector.get_indexes('order_items')}
+
+    for column in ('order_id', 'product_id'):
+        name = op.f(f'ix_order_items_{column}')
+        if name not in existing_indexes:
+            op.create_index(name, 'order_items', [column], unique=False)
+
+    # Backfill outside the migration transaction so every batch commits on
+    # its own. A batch's INSERT may go out as several statements, each
+    # committed separately, so an interrupted run can leave an order with
+    # only some of its items. A re-run therefore compares each order's item
+    # count with its JSON and rewrites any order that doesn't match. Orders
+    # without items_json were placed after the upgrade and are left alone.
+    with op.get_context().autocommit_block():
+        product_ids = set(bind.execute(sa.select(products.c.id)).scalars())
+
+        last_id = 0
+        while True:
+            rows = bind.execute(
+                sa.select(orders.c.id, orders.c.items_json)
+                .where(orders.c.id > last_id)
+                .where(orders.c.items_json.is_not(None))
+                .order_by(orders.c.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+
+            existing = dict(bind.execute(
+                sa.select(order_items.c.order_id, sa.func.count())
+                .where(order_items.c.order_id.in_([r.id for r in rows]))
+                .group_by(order_items.c.order_id)
+            ).all())
+
+            partial = []
+            values = []
+            for order_id, items_json in rows:
+                items = json.loads(items_json or "[]")
+                have = existing.get(order_id, 0)
+                if have == len(items):
+                    continue
+                if have:
+                    partial.append(order_id)
+
+                for item in items:
+                    product_id = item.get("product_id")
+                    values.append({
+                        "order_id": order_id,
+                        "product_id": product_id if product_id in product_ids else None,
+                        "name": item.get("name"),
+                        "price": item.get("price"),
+                        "quantity": item.get("quantity"),
+                    })
+
+            if partial:
+                bind.execute(order_items.delete().where(order_items.c.order_id.in_(partial)))
+            if values:
+                bind.execute(order_items.insert(), values)
+            last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    # Orders placed after the upgrade only have order_items; write their
+    # items back to items_json before the table goes away.
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        order_ids = bind.execute(
+            sa.select(orders.c.id)
+            .where(orders.c.id > last_id)
+            .where(orders.c.items_json.is_(None))
+            .order_by(orders.c.id)
+            .limit(BATCH_SIZE)
+        ).scalars().all()
+        if not order_ids:
+            break
+
+        items = {order_id: [] for order_id in order_ids}
+        for row in bind.execute(
+            sa.select(order_items)
+            .where(order_items.c.order_id.in_(order_ids))
+            .order_by(order_items.c.id)
+        ):
+            items[row.order_id].append({
+                "product_id": row.product_id,
+                "name": row.name,
+                "quantity": row.quantity,
+                "price": row.price,
+            })
+
+        for order_id, order_items_data in items.items():
+            bind.execute(
+                orders.update()
+                .where(orders.c.id == order_id)
+                .values(items_json=json.dumps(order_items_data))
+            )
+        last_id = order_ids[-1]
+
+    op.drop_index(op.f('ix_order_items_product_id'), table_name='order_items')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_table('order_items')
@@ -0,0 +1,28 @@
+"""add order status and created_at indexes
+
+Revision ID: cd76da9e3d96
+Revises: 2763c56bd57d
+Create Date: 2026-10-18 10:03:27.551902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd76da9e3d96'
+down_revision: Union[str, None] = '2763c56bd57d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_orders_created_at'), 'orders', ['created_at'], unique=False)
+    op.create_index(op.f('ix_orders_status'), 'orders', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_orders_status'), table_name='orders')
+    op.drop_index(op.f('ix_orders_created_at'), table_name='orders')
@@ -0,0 +1,31 @@
+"""add change stamps
+
+Revision ID: e1f6a3b8c249
+Revises: 9c4e2b7d6a15
+Create Date: 2026-10-18 15:31:44.207815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f6a3b8c249'
+down_revision: Union[str, None] = '9c4e2b7d6a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('change_stamps',
+    sa.Column('scope', sa.String(length=16), nullable=False),
+    sa.Column('key', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('change_stamps')
@@ -0,0 +1,40 @@
+"""add daily_sales rollup
+
+Revision ID: e5f50827175a
+Revises: cd76da9e3d96
+Create Date: 2026-10-18 10:41:09.377164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f50827175a'
+down_revision: Union[str, None] = 'cd76da9e3d96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    # Seed from existing orders; `python -m app.cli rebuild-daily-sales`
+    # recomputes it later if needed.
+    op.execute(
+        "INSERT INTO daily_sales (day, order_count, revenue) "
+        "SELECT date(created_at), count(id), coalesce(sum(total_price), 0) "
+        "FROM orders "
+        "WHERE status IS NULL OR status != 'Cancelled' "
+        "GROUP BY date(created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_sales')
@@ -0,0 +1,47 @@
+"""shard daily_sales rows
+
+Revision ID: f3b7d1c9a2e4
+Revises: e1f6a3b8c249
+Create Date: 2026-10-18 17:02:13.518240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d1c9a2e4'
+down_revision: Union[str, None] = 'e1f6a3b8c249'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows become shard 0 of their day
+    with op.batch_alter_table('daily_sales') as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.drop_constraint('daily_sales_pkey', type_='primary')
+        batch_op.create_primary_key('daily_sales_pkey', ['day', 'shard'])
+
+
+def downgrade() -> None:
+    # Fold every day's shards into its shard 0 row
+    op.execute(
+        "INSERT INTO daily_sales (day, shard, order_count, revenue) "
+        "SELECT DISTINCT d.day, 0, 0, 0 FROM daily_sales d "
+        "WHERE NOT EXISTS (SELECT 1 FROM daily_sales z WHERE z.day = d.day AND z.shard = 0)"
+    )
+    op.execute(
+        "UPDATE daily_sales SET "
+        "order_count = (SELECT SUM(d.order_count) FROM daily_sales d WHERE d.day = daily_sales.day), "
+        "revenue = (SELECT SUM(d.revenue) FROM daily_sales d WHERE d.day = daily_sales.day) "
+        "WHERE shard = 0"
+    )
+    op.execute("DELETE FROM daily_sales WHERE shard <> 0")
+
+    with op.batch_alter_table('daily_sales') as batch_op:
+        batch_op.drop_constraint('daily_sales_pkey', type_='primary')
+        batch_op.create_primary_key('daily_sales_pkey', ['day'])
+        batch_op.drop_column('shard')
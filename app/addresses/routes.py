@@ -3,12 +3,13 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Address
 from app.deps import get_current_user
-from app.schemas import AddressCreate
+from app.schemas import AddressCreate, AddressOut
+from app.querybudget import query_budget
 
-router = APIRouter(prefix="/addresses", tags=["Addresses"])
+router = APIRouter(prefix="/addresses", tags=["Addresses"], dependencies=[query_budget(4)])
 
 
-@router.post("")
+@router.post("", response_model=AddressOut)
 def add_address(data: AddressCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     addr = Address(
         user_id=user.id,
@@ -24,7 +25,7 @@ def add_address(data: AddressCreate, db: Session = Depends(get_db), user=Depends
     return addr
 
 
-@router.get("")
+@router.get("", response_model=list[AddressOut])
 def list_addresses(db: Session = Depends(get_db), user=Depends(get_current_user)):
     return db.query(Address).filter(Address.user_id == user.id).all()
 
@@ -1,30 +1,34 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import date
+from datetime import date, datetime, time, timedelta
 
 from app.database import get_db
 from app.models import Order
 from app.auth.utils import admin_required
+from app import sales
+from app.querybudget import query_budget
 
-router = APIRouter(prefix="/admin/dashboard", tags=["Admin Dashboard"])
+router = APIRouter(prefix="/admin/dashboard", tags=["Admin Dashboard"], dependencies=[query_budget(2)])
 
 
 @router.get("/stats")
 def dashboard_stats(db: Session = Depends(get_db), _=Depends(admin_required)):
-    orders = db.query(Order).all()
-
-    total_revenue = sum(o.total_price for o in orders)
-    total_orders = len(orders)
-
-    today = date.today()
+    today_start = datetime.combine(date.today(), time.min)
+    tomorrow_start = today_start + timedelta(days=1)
+    is_today = (Order.created_at >= today_start) & (Order.created_at < tomorrow_start)
 
-    today_orders = [
-        o for o in orders if o.created_at.date() == today
-    ]
+    # All four numbers in a single aggregate pass; no rows leave the database
+    row = db.query(
+        func.coalesce(func.sum(Order.total_price), 0),
+        func.count(Order.id),
+        func.coalesce(func.sum(Order.total_price).filter(is_today), 0),
+        func.count(Order.id).filter(Order.status == "Pending"),
+    ).one()
 
-    today_revenue = sum(o.total_price for o in today_orders)
-
-    pending_orders = len([o for o in orders if o.status == "Pending"])
+    total_revenue, total_orders, today_revenue, pending_orders = row
 
     return {
         "total_revenue": total_revenue,
@@ -33,3 +37,25 @@ def dashboard_stats(db: Session = Depends(get_db), _=Depends(admin_required)):
         "pending_orders": pending_orders,
     }
 
+
+# Reads only the daily_sales rollup, never the orders table
+@router.get("/timeseries")
+def dashboard_timeseries(
+    granularity: Literal["day", "week", "month"] = "day",
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    _=Depends(admin_required),
+):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+
+    if start > end:
+        raise HTTPException(400, "'from' must not be after 'to'")
+
+    return {
+        "granularity": granularity,
+        "from": start,
+        "to": end,
+        "series": sales.timeseries(db, start, end, granularity),
+    }
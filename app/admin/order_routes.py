@@ -1,58 +1,184 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from app.database import get_db
-from app.models import Order, User, Address
-from app.auth.utils import admin_required
+import csv
+import io
 import json
+from datetime import date, datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
+from app.database import get_db, SessionLocal
+from app.models import Order
+from app.auth.utils import admin_required
+from app import etags, sales
+from app.querybudget import query_budget
+from app.orders.listing import serialize_items, admin_orders_query, admin_order_page, split_page
 
-router = APIRouter(prefix="/admin/orders", tags=["Admin Orders"])
+router = APIRouter(prefix="/admin/orders", tags=["Admin Orders"], dependencies=[query_budget(4)])
 
 
 # ================= LIST ORDERS =================
 
 @router.get("")
-def list_orders(status: str | None = None, db: Session = Depends(get_db), _=Depends(admin_required)):
-    q = db.query(Order).options(joinedload(Order.user), joinedload(Order.address))
-
-    if status:
-        q = q.filter(Order.status == status)
-
-    orders = q.order_by(Order.id.desc()).all()
-
-    return [
-        {
-            "id": o.id,
-            "total": o.total_price,
-            "status": o.status,
-            "tracking_number": o.tracking_number,
-            "created_at": o.created_at,
-            "user": {
-                "name": o.user.name,
-                "mobile": o.user.mobile,
-            },
-            "address": {
-                "name": o.address.name,
-                "mobile": o.address.mobile,
-                "address_line": o.address.address_line,
-                "city": o.address.city,
-                "pincode": o.address.pincode,
-            },
-            "items": json.loads(o.items_json),
-        }
-        for o in orders
-    ]
+def list_orders(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    status: str | None = None,
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    city: str | None = None,
+    db: Session = Depends(get_db),
+    _=Depends(admin_required),
+):
+    q = admin_orders_query(status, start, end, city).options(selectinload(Order.items))
+    rows = db.scalars(admin_order_page(q, limit, cursor)).all()
+    orders, next_cursor = split_page(rows, limit)
+
+    return {
+        "items": [
+            {
+                "id": o.id,
+                "total": o.total_price,
+                "status": o.status,
+                "tracking_number": o.tracking_number,
+                "created_at": o.created_at,
+                "user": {
+                    "name": o.user.name,
+                    "mobile": o.user.mobile,
+                },
+                "address": {
+                    "name": o.address.name,
+                    "mobile": o.address.mobile,
+                    "address_line": o.address.address_line,
+                    "city": o.address.city,
+                    "pincode": o.address.pincode,
+                },
+                "items": serialize_items(o.items),
+            }
+            for o in orders
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+# ================= EXPORT =================
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id", "created_at", "status", "total", "tracking_number",
+    "customer_name", "customer_mobile",
+    "address_name", "address_mobile", "address_line", "city", "pincode",
+    "items",
+]
+
+
+def _export_row(o: Order) -> dict:
+    return {
+        "id": o.id,
+        "created_at": o.created_at.isoformat() if o.created_at else None,
+        "status": o.status,
+        "total": o.total_price,
+        "tracking_number": o.tracking_number,
+        "customer_name": o.user.name if o.user else None,
+        "customer_mobile": o.user.mobile if o.user else None,
+        "address_name": o.address.name if o.address else None,
+        "address_mobile": o.address.mobile if o.address else None,
+        "address_line": o.address.address_line if o.address else None,
+        "city": o.address.city if o.address else None,
+        "pincode": o.address.pincode if o.address else None,
+        "items": serialize_items(o.items),
+    }
+
+
+def _export_orders(status, start, end, city):
+    # Own session: the generator outlives the request's dependencies
+    db = SessionLocal()
+    try:
+        q = (
+            admin_orders_query(status, start, end, city)
+            .options(selectinload(Order.items))
+            .order_by(Order.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+
+        # Server-side cursor; only one batch of ORM objects is alive at a time
+        yield from db.scalars(q)
+    finally:
+        db.close()
+
+
+def _csv_chunks(orders):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+
+    for n, o in enumerate(orders, 1):
+        row = _export_row(o)
+        row["items"] = json.dumps(row["items"])
+        writer.writerow(row)
+
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(orders):
+    lines = []
+    for o in orders:
+        lines.append(json.dumps(_export_row(o)))
+
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+# Reads in EXPORT_BATCH_SIZE batches, each with its own items SELECT
+@router.get("/export", dependencies=[query_budget(None, repeats=None)])
+def export_orders(
+    format: Literal["csv", "ndjson"] = "csv",
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    status: str | None = None,
+    city: str | None = None,
+    _=Depends(admin_required),
+):
+    orders = _export_orders(status, start, end, city)
+
+    if format == "csv":
+        body, media_type = _csv_chunks(orders), "text/csv"
+    else:
+        body, media_type = _ndjson_chunks(orders), "application/x-ndjson"
+
+    filename = f"orders-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 # ================= UPDATE STATUS =================
 
 @router.put("/{order_id}/status")
 def update_status(order_id: int, status: str, db: Session = Depends(get_db), _=Depends(admin_required)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
 
     if not order:
         raise HTTPException(404, "Order not found")
 
+    rollup = sales.status_changed(db, order, order.status, status)
+    if rollup is not None:
+        db.execute(rollup)
+
     order.status = status
+    db.execute(etags.bump(db, etags.ORDERS, order.user_id))
     db.commit()
 
     return {"success": True}
@@ -68,6 +194,7 @@ def update_tracking(order_id: int, tracking: str, db: Session = Depends(get_db),
         raise HTTPException(404, "Order not found")
 
     order.tracking_number = tracking
+    db.execute(etags.bump(db, etags.ORDERS, order.user_id))
     db.commit()
 
     return {"success": True}
@@ -1,45 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.database import get_db
-from app.models import Order, Address
+from app.models import Order
 from app.auth.utils import admin_required
-import json
+from app import etags, sales
+from app.querybudget import query_budget
+from app.orders.listing import serialize_items, admin_orders_query, admin_order_page, split_page
 
-router = APIRouter(prefix="/admin", tags=["Admin"])
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[query_budget(3)])
 
 
 # 📌 Get all orders (with user, price & status)
 @router.get("/orders")
-def get_all_orders(user=Depends(admin_required), db: Session = Depends(get_db)):
-    orders = db.query(Order).order_by(Order.id.desc()).all()
+def get_all_orders(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    status: str | None = None,
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    city: str | None = None,
+    user=Depends(admin_required),
+    db: Session = Depends(get_db),
+):
+    q = admin_order_page(admin_orders_query(status, start, end, city), limit, cursor)
+    orders, next_cursor = split_page(db.scalars(q).all(), limit)
 
-    return [
-        {
-            "order_id": o.id,
-            "total_price": o.total_price,
-            "status": o.status,
-            "customer": o.user.name if o.user else None,
-            "created_at": o.created_at,
-        }
-        for o in orders
-    ]
+    return {
+        "items": [
+            {
+                "order_id": o.id,
+                "total_price": o.total_price,
+                "status": o.status,
+                "customer": o.user.name if o.user else None,
+                "created_at": o.created_at,
+            }
+            for o in orders
+        ],
+        "next_cursor": next_cursor,
+    }
 
 
 # 📌 Get full order details for admin view
 @router.get("/orders/{order_id}")
 def admin_order_details(order_id: int, user=Depends(admin_required), db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    # Customer and address are joined in; items come in one more statement
+    order = (
+        db.query(Order)
+        .options(joinedload(Order.user), joinedload(Order.address), selectinload(Order.items))
+        .filter(Order.id == order_id)
+        .first()
+    )
 
     if not order:
         raise HTTPException(404, "Order not found")
 
-    address = db.query(Address).filter(Address.id == order.address_id).first()
+    address = order.address
 
     return {
         "order_id": order.id,
         "status": order.status,
         "total_price": order.total_price,
-        "items": json.loads(order.items_json),
+        "items": serialize_items(order.items),
         "customer": order.user.name if order.user else None,
         "address": {
             "name": address.name,
@@ -58,12 +81,17 @@ def update_status(order_id: int, status: str, user=Depends(admin_required), db:
     if status not in ["Pending", "Delivered", "Cancelled"]:
         raise HTTPException(400, "Invalid status")
 
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
 
     if not order:
         raise HTTPException(404, "Order not found")
 
+    rollup = sales.status_changed(db, order, order.status, status)
+    if rollup is not None:
+        db.execute(rollup)
+
     order.status = status
+    db.execute(etags.bump(db, etags.ORDERS, order.user_id))
     db.commit()
     return {"success": True, "new_status": status}
 
@@ -0,0 +1,23 @@
+import anyio.to_thread
+from fastapi import APIRouter, Depends
+
+from app.database import pool_status
+from app.auth.utils import admin_required
+from app.querybudget import query_budget
+
+router = APIRouter(prefix="/admin/system", tags=["Admin System"], dependencies=[query_budget(1)])
+
+
+# Connection pools and threadpool, for sizing pods under load
+@router.get("/pools")
+async def pools(_=Depends(admin_required)):
+    limiter = anyio.to_thread.current_default_thread_limiter()
+
+    return {
+        "db": pool_status(),
+        "threadpool": {
+            "size": limiter.total_tokens,
+            "in_use": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        },
+    }
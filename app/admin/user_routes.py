@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.database import get_db
-from app.models import User
+from app.models import Order, User
 from app.auth.utils import admin_required
+from app.auth.principal_cache import invalidate_user
+from app.schemas import UserOut
+from app.querybudget import query_budget
 
-router = APIRouter(prefix="/admin/users", tags=["Admin Users"])
+router = APIRouter(prefix="/admin/users", tags=["Admin Users"], dependencies=[query_budget(3)])
 
 
 # ✅ LIST USERS
-@router.get("")
+@router.get("", response_model=list[UserOut])
 def list_users(
     db: Session = Depends(get_db),
     _: User = Depends(admin_required)
@@ -31,6 +34,7 @@ def make_admin(
 
     user.role = "admin"
     db.commit()
+    invalidate_user(user_id)
 
     return {"message": "User promoted to admin"}
 
@@ -49,24 +53,36 @@ def remove_admin(
 
     user.role = "user"
     db.commit()
+    invalidate_user(user_id)
 
     return {"message": "Admin role removed"}
 
 
 # ❌ DELETE USER
-@router.delete("/{user_id}")
+@router.delete("/{user_id}", dependencies=[query_budget(9)])
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
     _: User = Depends(admin_required)
 ):
-    user = db.query(User).get(user_id)
+    # Load what the delete cascades to up front; lazily it was one items
+    # SELECT per order
+    user = (
+        db.query(User)
+        .options(
+            selectinload(User.orders).selectinload(Order.items),
+            selectinload(User.addresses),
+        )
+        .filter(User.id == user_id)
+        .first()
+    )
 
     if not user:
         raise HTTPException(404, "User not found")
 
     db.delete(user)
     db.commit()
+    invalidate_user(user_id)
 
     return {"message": "User deleted"}
 
@@ -0,0 +1,90 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, status
+
+from app.auth import utils
+from app.config import BCRYPT_WORKERS, BCRYPT_MAX_PENDING
+from app.metrics import Counter, Histogram
+
+# bcrypt runs in its own processes so a login burst can't occupy the
+# threadpool (or the GIL) that every other endpoint needs.
+
+_pool: ProcessPoolExecutor | None = None
+_pending = 0  # only touched from the event loop thread
+
+# Queue wait plus hashing, as seen by the request
+duration = Histogram()
+rejected = Counter()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forked workers would inherit the DB pool's open sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=BCRYPT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _discard(pool: ProcessPoolExecutor):
+    # A worker died (OOM kill, segfault) and the executor refuses all further
+    # work; drop it so the next call starts a fresh one
+    global _pool
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _run(fn, *args):
+    global _pending
+
+    if _pending >= BCRYPT_MAX_PENDING:
+        rejected.inc()
+        raise _busy()
+
+    _pending += 1
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        pool = _get_pool()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            _discard(pool)
+            raise _busy()
+    finally:
+        _pending -= 1
+        duration.observe(time.perf_counter() - start)
+
+
+def pending() -> int:
+    return _pending
+
+
+async def hash_password(password: str) -> str:
+    return await _run(utils.hash_password, password)
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await _run(utils.verify_password, plain, hashed)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
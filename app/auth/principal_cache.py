@@ -0,0 +1,58 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+
+from app.cache import TTLCache
+from app.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by route handlers (no DB session attached)."""
+    id: int
+    name: str | None
+    mobile: str | None
+    role: str
+
+
+# token digest -> (principal, user generation at fill time)
+_entries = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+# Bumped per user id whenever an admin changes or deletes that user; entries
+# filled under an older generation are treated as misses.
+_generations: dict[int, int] = {}
+_lock = threading.Lock()
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def get(digest: bytes) -> Principal | None:
+    entry = _entries.get(digest)
+    if entry is None:
+        return None
+
+    principal, generation = entry
+    if _generations.get(principal.id, 0) != generation:
+        _entries.pop(digest)
+        return None
+
+    return principal
+
+
+def put(digest: bytes, principal: Principal, expires_at: float, generation: int):
+    # Never outlive the token itself
+    ttl = min(PRINCIPAL_CACHE_TTL, expires_at - time.time())
+    if ttl > 0:
+        _entries.set(digest, (principal, generation), ttl=ttl)
+
+
+def generation(user_id: int) -> int:
+    return _generations.get(user_id, 0)
+
+
+def invalidate_user(user_id: int):
+    with _lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
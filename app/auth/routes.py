@@ -1,34 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models import User
-from app.auth.utils import (
-    hash_password,
-    verify_password,
-    create_access_token,
-)
+from app.auth import hashing
+from app.auth.utils import create_access_token
 from app.schemas import SignupRequest, LoginRequest
+from app.querybudget import query_budget
 
-router = APIRouter(prefix="/auth")
-
-
-# --------------------
-# DB Dependency
-# --------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(prefix="/auth", dependencies=[query_budget(3)])
 
 
 # --------------------
 # SIGNUP
 # --------------------
 @router.post("/signup")
-def signup(data: SignupRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.mobile == data.mobile).first()
+async def signup(data: SignupRequest, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(User).where(User.mobile == data.mobile))
     if existing:
         raise HTTPException(
             status_code=400,
@@ -37,7 +25,7 @@ def signup(data: SignupRequest, db: Session = Depends(get_db)):
 
     # 🔒 bcrypt safety (72-byte max)
     try:
-        hashed_password = hash_password(data.password)
+        hashed_password = await hashing.hash_password(data.password)
     except ValueError as e:
         raise HTTPException(
             status_code=400,
@@ -52,8 +40,7 @@ def signup(data: SignupRequest, db: Session = Depends(get_db)):
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
     # ✅ CORRECT TOKEN CREATION
     token = create_access_token(user.id, user.role)
@@ -74,10 +61,10 @@ def signup(data: SignupRequest, db: Session = Depends(get_db)):
 # LOGIN
 # --------------------
 @router.post("/login")
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.mobile == data.mobile).first()
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.mobile == data.mobile))
 
-    if not user or not verify_password(data.password, user.password):
+    if not user or not await hashing.verify_password(data.password, user.password):
         raise HTTPException(
             status_code=401,
             detail="Invalid mobile or password"
@@ -1,12 +1,14 @@
 from fastapi import Depends, HTTPException, Header, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
+from app.auth import principal_cache
+from app.auth.principal_cache import Principal
 
 SECRET_KEY = "MYJWTSECRET123"  # TODO: move to env
 ALGORITHM = "HS256"
@@ -50,10 +52,10 @@ def decode_token(token: str) -> Optional[dict]:
 # -----------------------
 # Dependencies
 # -----------------------
-def get_current_user(
+async def get_current_user(
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,6 +69,13 @@ def get_current_user(
         )
 
     token = authorization.split(" ", 1)[1].strip()
+
+    # A token seen recently skips both the signature check and the user lookup
+    digest = principal_cache.token_digest(token)
+    principal = principal_cache.get(digest)
+    if principal:
+        return principal
+
     payload = decode_token(token)
 
     if not payload:
@@ -82,17 +91,21 @@ def get_current_user(
             detail="Invalid token payload",
         )
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    generation = principal_cache.generation(int(user_id))
+    user = await db.get(User, int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
 
-    return user
+    principal = Principal(id=user.id, name=user.name, mobile=user.mobile, role=user.role)
+    principal_cache.put(digest, principal, payload["exp"], generation)
+
+    return principal
 
 
-def admin_required(user: User = Depends(get_current_user)) -> User:
+def admin_required(user: Principal = Depends(get_current_user)) -> Principal:
     if user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import (
+    CATALOG_CACHE_SIZE,
+    CATALOG_CACHE_TTL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class VersionedCache:
+    """
+    Read-through cache for data that changes only through known write paths.
+
+    Writers call ``invalidate()`` after committing, which bumps the version so
+    every earlier entry (and any load still in progress) is discarded.
+    Concurrent misses for the same key share one loader call:
+    ``get_or_load`` for sync handlers (threads), ``aget_or_load`` for async
+    ones (one event loop).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.version = 0
+        self._entries = TTLCache(maxsize, ttl)
+        self._flights = {}
+        self._afutures = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            version = self.version
+            return version, self._entries.get((version, key), _MISSING)
+
+    def _store(self, version, key, value):
+        with self._lock:
+            # Don't keep a result that raced with an invalidation
+            if self.version == version:
+                self._entries.set((version, key), value)
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            version = self.version
+            vkey = (version, key)
+            value = self._entries.get(vkey, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            flight = self._flights.get(vkey)
+            leader = flight is None
+            if leader:
+                flight = self._flights[vkey] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(vkey, None)
+            if flight.error is None:
+                self._store(version, key, flight.value)
+            flight.done.set()
+
+        return flight.value
+
+    async def aget_or_load(self, key, loader):
+        version, value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        vkey = (version, key)
+        future = self._afutures.get(vkey)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leading request went away mid-load; load for ourselves
+                return await loader()
+
+        future = self._afutures[vkey] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here; followers re-raise it
+            raise
+        finally:
+            self._afutures.pop(vkey, None)
+
+        future.set_result(value)
+        self._store(version, key, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+
+# ================= CATALOG =================
+# Products and categories: written only by the admin product/category
+# handlers, read by every app launch.
+
+catalog_cache = VersionedCache(CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL)
+
+# Search pages, keyed by catalog_cache.version so every catalog write also
+# retires them without the writers knowing about this cache.
+search_cache = VersionedCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
@@ -1,103 +1,217 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import Cart, CartItem, Product
-from app.database import get_db
-from app.auth.utils import get_current_user 
+from app.database import get_async_db, dialect_insert
+from app.auth.utils import get_current_user
+from app import etags, inventory
+from app.images import image_variants
+from app.schemas import CartOut, CartSync
+from app.querybudget import query_budget
+
+router = APIRouter(prefix="/cart", tags=["Cart"], dependencies=[query_budget(4)])
+
+
+def _user_item(user_id: int, item_id: int):
+    return select(CartItem).join(Cart).where(
+        Cart.user_id == user_id,
+        CartItem.id == item_id
+    )
+
 
-router = APIRouter(prefix="/cart", tags=["Cart"])
+async def upsert_cart_id(db: AsyncSession, user_id: int) -> int:
+    # Get-or-create in one statement; the no-op update makes RETURNING
+    # yield the existing row on conflict
+    insert_ = dialect_insert(db)
+    stmt = insert_(Cart).values(user_id=user_id, total_price=0)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Cart.user_id],
+        set_={"user_id": stmt.excluded.user_id},
+    )
+    return await db.scalar(stmt.returning(Cart.id))
 
 
 # ➕ Add item to cart
 @router.post("/add/{product_id}")
-def add_to_cart(product_id: int, quantity: int = 1, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    user_id = user.id 
-
-    product = db.query(Product).get(product_id)
-    if not product:
-        raise HTTPException(404, "Product not found")
-
-    cart = db.query(Cart).filter(Cart.user_id == user.id).first()
-    if not cart:
-        cart = Cart(user_id=user.id, total_price=0)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-
-    item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id,
-        CartItem.product_id == product_id
-    ).first()
-
-    if item:
-        item.quantity += 1
-    else:
-        item = CartItem(cart_id=cart.id, product_id=product_id, quantity=1)
-        db.add(item)
-
-    db.commit()
+async def add_to_cart(product_id: int, quantity: int = Query(1, ge=1), user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    cart_id = await upsert_cart_id(db, user.id)
+
+    # Atomic increment: concurrent taps can't lose an update
+    insert_ = dialect_insert(db)
+    stmt = insert_(CartItem).values(cart_id=cart_id, product_id=product_id, quantity=quantity)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CartItem.cart_id, CartItem.product_id],
+        set_={"quantity": CartItem.quantity + stmt.excluded.quantity},
+    )
+
+    try:
+        await db.execute(stmt)
+        await db.execute(etags.bump(db, etags.CART, user.id))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        # Only the products FK means "no such product"; anything else is a bug
+        if await db.get(Product, product_id) is None:
+            raise HTTPException(404, "Product not found")
+        raise
+
     return {"message": "Added to cart"}
 
 
 # 🛒 Get My Cart
-@router.get("")
-def get_cart(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    user_id = user.id 
-
-    cart = db.query(Cart).filter(Cart.user_id == user.id).first()
-    if not cart or not cart.items:
+async def priced_cart(db: AsyncSession, user_id: int) -> dict:
+    # Cart, items and products in one statement; totals in the same pass
+    rows = (await db.execute(
+        select(
+            Cart.id,
+            CartItem.id,
+            CartItem.quantity,
+            Product.id,
+            Product.name,
+            Product.price,
+            Product.image_url,
+        )
+        .join(CartItem, CartItem.cart_id == Cart.id)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(Cart.user_id == user_id)
+        .order_by(CartItem.id)
+    )).all()
+
+    if not rows:
         return {"cart_id": None, "items": [], "total_price": 0}
 
-    items = [
-        {
-            "id": i.id,
-            "quantity": i.quantity,
+    items = []
+    total_price = 0
+    for cart_id, item_id, quantity, product_id, name, price, image_url in rows:
+        items.append({
+            "id": item_id,
+            "quantity": quantity,
             "product": {
-                "id": i.product.id,
-                "name": i.product.name,
-                "price": i.product.price,
-                "image_url": i.product.image_url or ""
+                "id": product_id,
+                "name": name,
+                "price": price,
+                "image_url": image_url or "",
+                "images": image_variants(image_url)
             }
-        }
-        for i in cart.items
+        })
+        total_price += quantity * price
+
+    return {"cart_id": rows[0][0], "items": items, "total_price": total_price}
+
+
+@router.get("", response_model=CartOut)
+async def get_cart(request: Request, response: Response, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    # Cart rows embed product data, so catalog changes count too
+    etag = await etags.stamp_etag(db, (etags.CART, user.id), (etags.CATALOG, 0))
+    if etags.matches(request, etag):
+        return etags.not_modified(ETag=etag)
+
+    response.headers["ETag"] = etag
+    return await priced_cart(db, user.id)
+
+
+# 🔄 Replace the whole cart (offline clients sync in one call)
+@router.put("", response_model=CartOut, dependencies=[query_budget(8)])
+async def sync_cart(data: CartSync, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    desired = {i.product_id: i.quantity for i in data.items}
+
+    if desired:
+        found = set((await db.scalars(
+            select(Product.id).where(Product.id.in_(desired))
+        )).all())
+        missing = sorted(desired.keys() - found)
+        if missing:
+            raise HTTPException(404, f"Products not found: {missing}")
+
+    cart_id = await upsert_cart_id(db, user.id)
+    current = dict((await db.execute(
+        select(CartItem.product_id, CartItem.quantity).where(CartItem.cart_id == cart_id)
+    )).all())
+
+    # Only touch rows that differ
+    removed = current.keys() - desired.keys()
+    changed = [
+        {"cart_id": cart_id, "product_id": pid, "quantity": qty}
+        for pid, qty in desired.items()
+        if current.get(pid) != qty
     ]
 
-    total_price = sum(i.quantity * i.product.price for i in cart.items)
+    if removed:
+        await db.execute(delete(CartItem).where(
+            CartItem.cart_id == cart_id,
+            CartItem.product_id.in_(removed)
+        ))
 
-    return {"cart_id": cart.id, "items": items, "total_price": total_price}
+    if changed:
+        insert_ = dialect_insert(db)
+        stmt = insert_(CartItem).values(changed)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id],
+            set_={"quantity": stmt.excluded.quantity},
+        )
+        await db.execute(stmt)
+
+    if removed or changed:
+        await db.execute(etags.bump(db, etags.CART, user.id))
+
+    await db.commit()
+    return await priced_cart(db, user.id)
 
 
 # 🔼 Change Quantity
 @router.patch("/update/{item_id}")
-def update_quantity(item_id: int, qty: int, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    user_id = user.id
-
-    item = db.query(CcartItem).join(Cart).filter(
-        Cart.user_id == user.id,
-        CartItem.id == item_id
-    ).first()
+async def update_quantity(item_id: int, qty: int = Query(..., ge=1), user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    item = await db.scalar(_user_item(user.id, item_id))
 
     if not item:
         raise HTTPException(404, "Cart item not found")
 
     item.quantity = qty
-    db.commit()
+    await db.execute(etags.bump(db, etags.CART, user.id))
+    await db.commit()
     return {"message": "updated"}
 
 
 # ❌ Remove Item
 @router.delete("/remove/{item_id}")
-def remove_item(item_id: int, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    user_id = user.id 
-
-    item = db.query(CartItem).join(Cart).filter(
-        Cart.user_id == user.id,
-        CartItem.id == item_id
-    ).first()
+async def remove_item(item_id: int, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    item = await db.scalar(_user_item(user.id, item_id))
 
     if not item:
         raise HTTPException(404, "Item not found")
 
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.execute(etags.bump(db, etags.CART, user.id))
+    await db.commit()
     return {"message": "removed"}
 
+
+# ⏳ Hold stock for the current cart until checkout (or expiry)
+# (one stock UPDATE per line, so no fixed statement budget)
+@router.post("/reserve", dependencies=[query_budget(None)])
+async def reserve_cart(user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    cart_id = await db.scalar(
+        select(Cart.id).where(Cart.user_id == user.id).with_for_update()
+    )
+
+    rows = [] if cart_id is None else (await db.execute(
+        select(CartItem.product_id, CartItem.quantity, Product.stock, Product.stock_shards)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.cart_id == cart_id)
+    )).all()
+
+    if not rows:
+        raise HTTPException(400, "Cart is empty")
+    if any(r.quantity <= 0 for r in rows):
+        raise HTTPException(400, "Invalid quantity in cart")
+
+    short, expires_at = await inventory.reserve(db, user.id, rows, datetime.utcnow())
+    if short:
+        await db.rollback()
+        raise HTTPException(409, f"Out of stock: {short}")
+
+    await db.commit()
+    return {"expires_at": expires_at.isoformat()}
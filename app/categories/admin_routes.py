@@ -1,24 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Category
+from app.models import Category, Product
 from app.auth.utils import admin_required
+from app.cache import catalog_cache
+from app import etags, search
+from app.schemas import CategoryOut
+from app.querybudget import query_budget
 
-router = APIRouter(prefix="/admin/categories", tags=["Admin Categories"])
+router = APIRouter(prefix="/admin/categories", tags=["Admin Categories"], dependencies=[query_budget(3)])
 
 
 # ---------------- LIST ----------------
-@router.get("")
+@router.get("", response_model=list[CategoryOut])
 def list_categories(
     db: Session = Depends(get_db),
     _=Depends(admin_required),
 ):
-    return db.query(Category).order_by(Category.name).all()
+    return catalog_cache.get_or_load(
+        ("admin_categories",),
+        lambda: [
+            CategoryOut.model_construct(id=c.id, name=c.name)
+            for c in db.query(Category).order_by(Category.name).all()
+        ],
+    )
 
 
 # ---------------- CREATE ----------------
-@router.post("")
+@router.post("", response_model=CategoryOut, dependencies=[query_budget(5)])
 def create_category(
     body: dict,
     db: Session = Depends(get_db),
@@ -36,14 +47,16 @@ def create_category(
     cat = Category(name=name.strip())
 
     db.add(cat)
+    db.execute(etags.bump(db, etags.CATALOG))
     db.commit()
     db.refresh(cat)
+    catalog_cache.invalidate()
 
     return cat
 
 
 # ---------------- DELETE ----------------
-@router.delete("/{cat_id}")
+@router.delete("/{cat_id}", dependencies=[query_budget(6)])
 def delete_category(
     cat_id: int,
     db: Session = Depends(get_db),
@@ -54,8 +67,18 @@ def delete_category(
     if not cat:
         raise HTTPException(404, "Category not found")
 
+    product_ids = db.scalars(select(Product.id).where(Product.category_id == cat_id)).all()
+
     db.delete(cat)
+    # The flush detaches the products; their search documents are rebuilt
+    # after it so the old category name drops out
+    db.flush()
+    if product_ids:
+        db.execute(search.refresh_documents(Product.id.in_(product_ids)))
+    db.execute(etags.bump(db, etags.CATALOG))
     db.commit()
+    search.touched(*product_ids)
+    catalog_cache.invalidate()
 
     return {"status": "deleted"}
 
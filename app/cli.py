@@ -0,0 +1,116 @@
+# Maintenance commands: python -m app.cli <command> --help
+import argparse
+import os
+from datetime import date
+
+from app.database import SessionLocal
+from app import images, inventory, sales, search
+from app.orders import idempotency
+
+
+def rebuild_daily_sales(args):
+    db = SessionLocal()
+    try:
+        sales.rebuild(db, since=args.since)
+        db.commit()
+    finally:
+        db.close()
+
+    print("daily_sales rebuilt" + (f" from {args.since}" if args.since else ""))
+
+
+def purge_idempotency_keys(args):
+    db = SessionLocal()
+    try:
+        removed = idempotency.purge(db)
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"removed {removed} expired idempotency keys")
+
+
+def release_stock_reservations(args):
+    db = SessionLocal()
+    try:
+        released = inventory.release_expired(db)
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"released {released} expired stock reservations")
+
+
+def build_image_variants(args):
+    built = 0
+    for filename in sorted(os.listdir(images.UPLOAD_DIR)):
+        stem, ext = os.path.splitext(filename)
+        if ext[1:].lower() not in images.ALLOWED_EXTENSIONS:
+            continue
+        if any(stem.endswith(f"_{name}") for name in images.VARIANTS):
+            continue
+        try:
+            images.make_variants(os.path.join(images.UPLOAD_DIR, filename))
+            built += 1
+        except Exception as e:
+            print(f"skipped {filename}: {e}")
+
+    print(f"variants ready for {built} images")
+
+
+def reindex_search(args):
+    db = SessionLocal()
+    try:
+        db.execute(search.refresh_documents())
+        db.commit()
+    finally:
+        db.close()
+
+    print("product search documents rebuilt")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser(
+        "rebuild-daily-sales",
+        help="backfill or rebuild the daily_sales rollup from orders",
+    )
+    cmd.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        help="only rebuild days on or after YYYY-MM-DD (default: everything)",
+    )
+    cmd.set_defaults(func=rebuild_daily_sales)
+
+    cmd = commands.add_parser(
+        "purge-idempotency-keys",
+        help="delete expired checkout Idempotency-Key entries",
+    )
+    cmd.set_defaults(func=purge_idempotency_keys)
+
+    cmd = commands.add_parser(
+        "release-stock-reservations",
+        help="return stock held by expired cart reservations",
+    )
+    cmd.set_defaults(func=release_stock_reservations)
+
+    cmd = commands.add_parser(
+        "build-image-variants",
+        help="generate thumb/medium WebP variants for images already in uploads/",
+    )
+    cmd.set_defaults(func=build_image_variants)
+
+    cmd = commands.add_parser(
+        "reindex-search",
+        help="rebuild products.search_document (e.g. after bulk imports)",
+    )
+    cmd.set_defaults(func=reindex_search)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from functools import lru_cache
+
+import anyio.to_thread
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import COMPRESS_MIN_SIZE
+from app.etags import matches, not_modified
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+# Text payloads only; images are already compressed
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/",
+)
+
+# Per-request bodies use cheap settings; cached bodies are compressed once
+# per catalog version, so they get the best ratio.
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6}
+CACHED_LEVELS = {"br": 11, "gzip": 9}
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    offered = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        offered.add(coding.strip().lower())
+
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _vary(headers: MutableHeaders):
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and "no-transform" not in headers.get("cache-control", "")
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+# ================= CACHED BODIES =================
+
+class PrecompressedBody:
+    """
+    A rendered JSON body plus its compressed forms, each built on first use.
+    Stored in catalog_cache so compression runs once per entry rather than
+    once per request. The ETag is a hash of the body, so it is the same on
+    every pod that renders the same data.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = compress(self.body, encoding, CACHED_LEVELS[encoding])
+            with self._lock:
+                self._encoded[encoding] = data
+        return data
+
+    async def response(self, request: Request) -> Response:
+        headers = {"Vary": "Accept-Encoding", "ETag": self.etag}
+        if matches(request, self.etag):
+            return not_modified(**headers)
+
+        encoding = negotiate(request.headers.get("accept-encoding"))
+
+        if encoding is None or len(self.body) < COMPRESS_MIN_SIZE:
+            return Response(self.body, media_type="application/json", headers=headers)
+
+        data = self._encoded.get(encoding)
+        if data is None:
+            # brotli at quality 11 takes milliseconds on a large page; keep
+            # the first compression after each invalidation off the event loop
+            data = await anyio.to_thread.run_sync(self.encoded, encoding)
+
+        headers["Content-Encoding"] = encoding
+        return Response(data, media_type="application/json", headers=headers)
+
+
+@lru_cache(maxsize=None)
+def _adapter(type_) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def render(value, type_) -> PrecompressedBody:
+    # Serialise once, in pydantic-core, for storing in a cache
+    return PrecompressedBody(_adapter(type_).dump_json(value))
+
+
+# ================= MIDDLEWARE =================
+
+class _Stream:
+    def __init__(self, encoding: str):
+        level = DYNAMIC_LEVELS[encoding]
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        self.encoding = encoding
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush per chunk so streamed exports reach the client as they go
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli for text responses of at least COMPRESS_MIN_SIZE bytes.
+    Responses that already carry a Content-Encoding (precompressed cached
+    bodies) pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        stream = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, stream, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                passthrough = not _compressible(Headers(raw=message["headers"]))
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                if start is not None and not passthrough:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is None and start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+
+                # Whole body in one message: compress only if worth it
+                if not more_body:
+                    if len(body) < COMPRESS_MIN_SIZE:
+                        _vary(headers)
+                        await send(start)
+                        await send(message)
+                        start = None
+                        return
+
+                    body = compress(body, encoding, DYNAMIC_LEVELS[encoding])
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    _vary(headers)
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    start = None
+                    return
+
+                # Streaming: length unknown up front
+                stream = _Stream(encoding)
+                headers["Content-Encoding"] = encoding
+                _vary(headers)
+                del headers["Content-Length"]
+                await send(start)
+                start = None
+
+            if stream is None:
+                await send(message)
+                return
+
+            data = stream.chunk(body) if body else b""
+            if not more_body:
+                data += stream.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -8,4 +8,60 @@ DATABASE_URL = os.getenv(
 JWT_SECRET = os.getenv("JWT_SECRET", "supersecret")
 JWT_ALGORITHM = "HS256"
 
+# Catalog read cache (app/cache.py)
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "1024"))
 
+# Search result cache. Kept apart from the catalog cache because its keys
+# are free text: a crawl of distinct queries must not evict the listings.
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+
+# Authenticated-principal cache (app/auth/principal_cache.py). Admin role
+# changes are invalidated instantly on the pod that made them; other pods
+# pick them up within the TTL.
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+# Password hashing pool (app/auth/hashing.py). Requests beyond
+# BCRYPT_MAX_PENDING queued hashes are rejected with 503.
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "64"))
+
+# Connection pools (app/database.py). The async engine serves the public
+# API; the sync engine only serves threadpool handlers (admin routes), so
+# its overflow is sized to the threadpool and no worker thread ever waits
+# on a connection that can't come.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SYNC_DB_POOL_SIZE = int(os.getenv("SYNC_DB_POOL_SIZE", "5"))
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "20"))
+SYNC_DB_MAX_OVERFLOW = max(0, THREADPOOL_SIZE - SYNC_DB_POOL_SIZE)
+
+# Checkout Idempotency-Key retention (app/orders/idempotency.py)
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", str(24 * 3600)))
+
+# Stock held by POST /cart/reserve (app/inventory.py). Expired holds are
+# returned when a checkout runs short on the product, and by
+# `python -m app.cli release-stock-reservations` (configs/cronjobs.yaml)
+STOCK_RESERVATION_TTL = float(os.getenv("STOCK_RESERVATION_TTL", "600"))
+
+# Image uploads (app/images.py)
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "1"))
+
+# Response compression (app/compression.py); smaller bodies go out as-is
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+
+# GET /metrics (app/telemetry.py); scrapers must send it as a Bearer token.
+# Unset, the endpoint answers 404 rather than serving metrics openly.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+# Per-request SQL budgets (app/querybudget.py): off | log | header | raise.
+# "raise" fails the request at the statement that breaks the budget and is
+# meant for tests; "log" and "header" suit staging.
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off").lower()
+# Identical statements allowed per request before it is reported as an N+1
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
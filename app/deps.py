@@ -1,39 +1,2 @@
-from fastapi import Depends, HTTPException, Header, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User
-from app.auth.utils import decode_token
-
-
-def get_current_user(
-    authorization: str = Header(None),
-    db: Session = Depends(get_db),
-):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization header missing")
-
-    if not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-
-    token = authorization.split(" ", 1)[1]
-    payload = decode_token(token)
-
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid token payload")
-
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    return user
-
-
-def admin_required(user: User = Depends(get_current_user)):
-    if user.role != "admin":
-        raise HTTPException(
-            status_code=403,
-            detail="Admin access required",
-        )
-    return user
-
+# Kept for existing imports; the implementation lives in app/auth/utils.py
+from app.auth.utils import get_current_user, admin_required  # noqa: F401
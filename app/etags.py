@@ -0,0 +1,56 @@
+from fastapi import Request, Response
+from sqlalchemy import and_, or_, select
+
+from app.database import dialect_insert
+from app.models import ChangeStamp
+
+# Conditional GET support.
+#
+# Cached catalog bodies carry a hash of their bytes as ETag (see
+# app/compression.py). Per-user resources that aren't cached (cart, order
+# list) are tagged with change stamps instead: counters in change_stamps
+# bumped in the same transaction as every write to the resource, so a
+# matching If-None-Match costs one primary-key lookup instead of the full
+# query and serialisation.
+
+CATALOG = "catalog"  # products/categories; cart bodies embed product data
+CART = "cart"        # key: user id
+ORDERS = "orders"    # key: user id
+
+
+def bump(db, scope: str, key: int = 0):
+    """Statement incrementing (or creating) the stamp for ``scope``/``key``."""
+    insert_ = dialect_insert(db)
+    stmt = insert_(ChangeStamp).values(scope=scope, key=key, version=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[ChangeStamp.scope, ChangeStamp.key],
+        set_={"version": ChangeStamp.version + 1},
+    )
+
+
+async def stamp_etag(db, *stamps: tuple[str, int]) -> str:
+    # One query for all stamps; missing rows count as version 0
+    rows = await db.execute(
+        select(ChangeStamp.scope, ChangeStamp.key, ChangeStamp.version).where(or_(*(
+            and_(ChangeStamp.scope == scope, ChangeStamp.key == key)
+            for scope, key in stamps
+        )))
+    )
+    versions = {(scope, key): version for scope, key, version in rows}
+    return 'W/"' + "-".join(str(versions.get(s, 0)) for s in stamps) + '"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    # Weak comparison: bodies differ per Content-Encoding, data doesn't
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def not_modified(**headers) -> Response:
+    return Response(status_code=304, headers=headers)
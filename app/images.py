@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from fastapi import HTTPException, UploadFile
+
+from app.cache import catalog_cache
+from app.config import IMAGE_MAX_BYTES, IMAGE_WORKERS
+
+# Uploads are stored as uploads/<sha256>.<ext>, so the same image uploaded
+# twice is stored once and a new upload can never overwrite another
+# product's file. Downscaled WebP variants are written next to it by a
+# process pool after the request has returned.
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads"
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
+CHUNK_SIZE = 1024 * 1024
+
+# name -> longest edge in pixels
+VARIANTS = {"thumb": 200, "medium": 800}
+
+_pool: ProcessPoolExecutor | None = None
+
+# Stems whose variants are all on disk. Filled by one directory scan at
+# import and then by finished jobs, so request handlers never stat files.
+# Variants built by the CLI in another process show up after a restart.
+_ready: set[str] = set()
+
+
+def _scan_ready():
+    names = set(os.listdir(UPLOAD_DIR))
+    suffixes = tuple(f"_{name}.webp" for name in VARIANTS)
+    for filename in names:
+        if filename.endswith(suffixes[0]):
+            stem = filename[:-len(suffixes[0])]
+            if all(f"{stem}{suffix}" in names for suffix in suffixes):
+                _ready.add(stem)
+
+
+_scan_ready()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forked workers would inherit the DB pool's open sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _discard(pool: ProcessPoolExecutor):
+    # A dead worker (OOM kill, segfault) breaks the executor for good; the
+    # next upload gets a fresh one
+    global _pool
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _variant_path(stem: str, name: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{stem}_{name}.webp")
+
+
+# ---------------- UPLOAD ----------------
+
+def save_upload(file: UploadFile) -> str:
+    """Stream an upload to disk under its content hash; returns its /uploads URL."""
+    ext = (file.filename or "").rsplit(".", 1)[-1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(400, "Invalid image format")
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := file.file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > IMAGE_MAX_BYTES:
+                    raise HTTPException(413, "Image too large")
+                digest.update(chunk)
+                out.write(chunk)
+
+        filename = f"{digest.hexdigest()}.{ext}"
+        path = os.path.join(UPLOAD_DIR, filename)
+
+        if os.path.exists(path):
+            os.remove(tmp_path)  # duplicate upload
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    schedule_variants(path)
+    return f"/uploads/{filename}"
+
+
+# ---------------- VARIANTS ----------------
+
+def make_variants(path: str):
+    # Runs in a worker process
+    from PIL import Image, ImageOps
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+        for name, edge in VARIANTS.items():
+            target = _variant_path(stem, name)
+            if os.path.exists(target):
+                continue
+
+            variant = img.copy()
+            variant.thumbnail((edge, edge))
+
+            # Write then rename so readers never see a half-written file
+            tmp = target + ".part"
+            variant.save(tmp, "WEBP", quality=80, method=4)
+            os.replace(tmp, target)
+
+
+def _variants_done(pool, stem, future):
+    if future.exception() is not None:
+        if isinstance(future.exception(), BrokenProcessPool):
+            _discard(pool)
+        logger.warning("image variants failed: %s", future.exception())
+        return
+    _ready.add(stem)
+    # Catalog and cart responses were built before the variants existed.
+    # Imported here so the worker processes don't set up DB engines.
+    from app import etags
+    from app.database import SessionLocal
+
+    # Drop the local cache first so this process serves the variants even
+    # if the version bump below fails
+    catalog_cache.invalidate()
+    try:
+        with SessionLocal() as db:
+            db.execute(etags.bump(db, etags.CATALOG))
+            db.commit()
+    except Exception:
+        logger.exception("catalog version bump after image variants failed")
+
+
+def schedule_variants(path: str):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if all(os.path.exists(_variant_path(stem, name)) for name in VARIANTS):
+        _ready.add(stem)
+        return
+
+    pool = _get_pool()
+    try:
+        future = pool.submit(make_variants, path)
+    except BrokenProcessPool:
+        _discard(pool)
+        pool = _get_pool()
+        future = pool.submit(make_variants, path)
+    future.add_done_callback(partial(_variants_done, pool, stem))
+
+
+def image_variants(image_url: str | None) -> dict | None:
+    """URLs of the generated variants for an /uploads image, once they exist."""
+    if not image_url or not image_url.startswith("/uploads/"):
+        return None
+
+    stem = os.path.splitext(os.path.basename(image_url))[0]
+    if stem not in _ready:
+        return None
+
+    return {name: f"/uploads/{stem}_{name}.webp" for name in VARIANTS}
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
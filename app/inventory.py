@@ -0,0 +1,267 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+
+from app.config import STOCK_RESERVATION_TTL
+from app.models import Product, ProductStockShard, StockReservation
+
+# Every decrement is a conditional UPDATE ... WHERE stock >= :q, so stock
+# can't go negative and nothing is read-then-written. Checkouts of the same
+# product still queue on its row until they commit; for flash-sale SKUs the
+# stock can be split across product_stock_shards rows so buyers land on
+# different rows.
+#
+# "lines" below are rows with product_id, quantity, stock and stock_shards
+# attributes (cart items selected together with their product's columns).
+
+
+def _tracked(line) -> bool:
+    return line.stock is not None or bool(line.stock_shards)
+
+
+def _give_back(product_id: int, quantity: int, shards: int | None):
+    if shards:
+        return update(ProductStockShard).where(
+            ProductStockShard.product_id == product_id,
+            ProductStockShard.shard == random.randrange(shards),
+        ).values(stock=ProductStockShard.stock + quantity)
+
+    return update(Product).where(
+        Product.id == product_id,
+        Product.stock.is_not(None),
+    ).values(stock=Product.stock + quantity)
+
+
+def _shard_counts(product_ids):
+    return select(Product.id, Product.stock_shards).where(Product.id.in_(product_ids))
+
+
+# ================= REQUEST PATH (async) =================
+
+async def _take_sharded(db, product_id: int, shards: int, quantity: int) -> bool:
+    # Probe shards in random order; one statement each
+    for shard in random.sample(range(shards), shards):
+        result = await db.execute(update(ProductStockShard).where(
+            ProductStockShard.product_id == product_id,
+            ProductStockShard.shard == shard,
+            ProductStockShard.stock >= quantity,
+        ).values(stock=ProductStockShard.stock - quantity))
+        if result.rowcount:
+            return True
+
+    # No single shard holds enough: gather from several under row locks
+    rows = (await db.execute(
+        select(ProductStockShard.shard, ProductStockShard.stock)
+        .where(ProductStockShard.product_id == product_id)
+        .order_by(ProductStockShard.shard)
+        .with_for_update()
+    )).all()
+
+    if sum(stock for _, stock in rows) < quantity:
+        return False
+
+    remaining = quantity
+    for shard, stock in rows:
+        n = min(stock, remaining)
+        if n <= 0:
+            continue
+        await db.execute(update(ProductStockShard).where(
+            ProductStockShard.product_id == product_id,
+            ProductStockShard.shard == shard,
+        ).values(stock=ProductStockShard.stock - n))
+        remaining -= n
+
+    return True
+
+
+async def _try_take(db, product_id: int, shards: int | None, quantity: int) -> bool:
+    if shards:
+        return await _take_sharded(db, product_id, shards, quantity)
+
+    result = await db.execute(update(Product).where(
+        Product.id == product_id,
+        Product.stock >= quantity,
+    ).values(stock=Product.stock - quantity))
+    return bool(result.rowcount)
+
+
+async def _release_expired_for(db, product_id: int, shards: int | None, now: datetime) -> int:
+    rows = (await db.execute(
+        delete(StockReservation)
+        .where(StockReservation.product_id == product_id, StockReservation.expires_at <= now)
+        .returning(StockReservation.quantity)
+    )).scalars().all()
+
+    if rows:
+        await db.execute(_give_back(product_id, sum(rows), shards))
+    return len(rows)
+
+
+async def _take(db, product_id: int, shards: int | None, quantity: int, now: datetime) -> bool:
+    if await _try_take(db, product_id, shards, quantity):
+        return True
+
+    # Short: abandoned holds may be sitting on the units. Only this path pays
+    # for the sweep; the CronJob in configs/ catches products nobody buys.
+    if await _release_expired_for(db, product_id, shards, now):
+        return await _try_take(db, product_id, shards, quantity)
+    return False
+
+
+async def _release(db, held: dict[int, int]):
+    if not held:
+        return
+    shards = dict((await db.execute(_shard_counts(held))).all())
+    for product_id, quantity in held.items():
+        if product_id in shards:
+            await db.execute(_give_back(product_id, quantity, shards[product_id]))
+
+
+async def _drop_reservations(db, user_id: int) -> dict[int, int]:
+    # DELETE .. RETURNING: each hold is handed back exactly once, even if the
+    # expiry sweep runs at the same time
+    rows = (await db.execute(
+        delete(StockReservation)
+        .where(StockReservation.user_id == user_id)
+        .returning(StockReservation.product_id, StockReservation.quantity)
+    )).all()
+
+    held = defaultdict(int)
+    for product_id, quantity in rows:
+        held[product_id] += quantity
+    return held
+
+
+async def take_for_order(db, user_id: int, lines, now: datetime) -> list[int]:
+    """
+    Decrement stock for a checkout, using the user's reservations first.
+    Returns the ids of products that are short; the caller must roll back
+    if any are.
+    """
+    held = await _drop_reservations(db, user_id)
+    short = []
+
+    # Fixed order so two checkouts never wait on each other's rows in a cycle
+    for line in sorted(lines, key=lambda l: l.product_id):
+        if line.quantity <= 0:
+            continue  # any hold on it stays in `held` and is given back
+
+        reserved = held.pop(line.product_id, 0)
+        if reserved > line.quantity:
+            held[line.product_id] = reserved - line.quantity
+            continue
+
+        need = line.quantity - reserved
+        if need and _tracked(line):
+            if not await _take(db, line.product_id, line.stock_shards, need, now):
+                short.append(line.product_id)
+
+    # Reserved but no longer in the cart
+    await _release(db, held)
+    return short
+
+
+async def reserve(db, user_id: int, lines, now: datetime) -> tuple[list[int], datetime]:
+    """Replace the user's holds with holds for ``lines``. Returns (short ids, expiry)."""
+    await _release(db, await _drop_reservations(db, user_id))
+
+    expires_at = now + timedelta(seconds=STOCK_RESERVATION_TTL)
+    short = []
+    holds = []
+
+    for line in sorted(lines, key=lambda l: l.product_id):
+        if line.quantity <= 0 or not _tracked(line):
+            continue
+        if await _take(db, line.product_id, line.stock_shards, line.quantity, now):
+            holds.append({
+                "user_id": user_id,
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "expires_at": expires_at,
+            })
+        else:
+            short.append(line.product_id)
+
+    if holds and not short:
+        await db.execute(insert(StockReservation), holds)
+
+    return short, expires_at
+
+
+# ================= ADMIN / CLI (sync) =================
+
+def stock_level(db, product: Product) -> dict:
+    if product.stock_shards:
+        stock = db.scalar(
+            select(func.coalesce(func.sum(ProductStockShard.stock), 0))
+            .where(ProductStockShard.product_id == product.id)
+        )
+    else:
+        stock = product.stock
+
+    reserved = db.scalar(
+        select(func.coalesce(func.sum(StockReservation.quantity), 0))
+        .where(StockReservation.product_id == product.id)
+    )
+
+    return {
+        "product_id": product.id,
+        "stock": stock,
+        "shards": product.stock_shards or 0,
+        "reserved": reserved,
+    }
+
+
+def set_stock(db, product: Product, stock: int | None, shards: int = 0):
+    """
+    Set a product's stock, optionally split over ``shards`` rows. ``stock``
+    counts every unit on hand, held ones included: the units under open
+    reservations are subtracted, since releasing them adds them back. If
+    fewer units are on hand than are held, the holds are dropped instead
+    and those buyers take stock at checkout like everyone else.
+    """
+    db.execute(delete(ProductStockShard).where(ProductStockShard.product_id == product.id))
+
+    reserved = db.scalar(
+        select(func.coalesce(func.sum(StockReservation.quantity), 0))
+        .where(StockReservation.product_id == product.id)
+    )
+    if stock is None or reserved > stock:
+        db.execute(delete(StockReservation).where(StockReservation.product_id == product.id))
+    elif reserved:
+        stock -= reserved
+
+    if stock is None or not shards:
+        product.stock = stock
+        product.stock_shards = None
+        return
+
+    base, extra = divmod(stock, shards)
+    db.execute(insert(ProductStockShard), [
+        {"product_id": product.id, "shard": i, "stock": base + (i < extra)}
+        for i in range(shards)
+    ])
+    product.stock = None
+    product.stock_shards = shards
+
+
+def release_expired(db, now: datetime | None = None) -> int:
+    rows = db.execute(
+        delete(StockReservation)
+        .where(StockReservation.expires_at <= (now or datetime.utcnow()))
+        .returning(StockReservation.product_id, StockReservation.quantity)
+    ).all()
+
+    held = defaultdict(int)
+    for product_id, quantity in rows:
+        held[product_id] += quantity
+
+    if held:
+        shards = dict(db.execute(_shard_counts(held)).all())
+        for product_id, quantity in held.items():
+            if product_id in shards:
+                db.execute(_give_back(product_id, quantity, shards[product_id]))
+
+    return len(rows)
@@ -1,11 +1,29 @@
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 # Ensure models are loaded
-from app import models
+from app import images, models
+from app.auth import hashing
+from app.config import THREADPOOL_SIZE
+from app.staticfiles import UploadStaticFiles
+from app.compression import CompressionMiddleware
+from app.telemetry import MetricsMiddleware
+from app import querybudget
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync handlers run here; the sync DB pool is sized to match (see config)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    yield
+    hashing.shutdown()
+    images.shutdown()
+
 
-app = FastAPI(title="Primerice API")
+app = FastAPI(title="Primerice API", lifespan=lifespan)
 
 # Routers
 from app.auth.routes import router as auth_router
@@ -21,6 +39,8 @@ from app.products.category_routes import router as category_router
 from app.categories.admin_routes import router as admin_categories_router
 from app.admin.order_routes import router as admin_orders_router
 from app.admin.dashboard_routes import router as dashboard_router
+from app.admin.system_routes import router as system_router
+from app.telemetry import router as metrics_router
 
 
 
@@ -36,10 +56,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --------------------
+# Compression
+# --------------------
+app.add_middleware(CompressionMiddleware)
+
+# --------------------
+# SQL budgets (QUERY_BUDGET_MODE); needs MetricsMiddleware outside it
+# --------------------
+if querybudget.ENABLED:
+    app.add_middleware(querybudget.QueryBudgetMiddleware)
+
+# --------------------
+# Metrics (outermost, so timings include the other middleware)
+# --------------------
+app.add_middleware(MetricsMiddleware)
+
 # --------------------
 # Static files
 # --------------------
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
 
 # --------------------
 # Health check (IMPORTANT)
@@ -71,5 +107,7 @@ app.include_router(category_router)
 app.include_router(admin_categories_router)
 app.include_router(admin_orders_router)
 app.include_router(dashboard_router)
+app.include_router(system_router)
+app.include_router(metrics_router)
 
 
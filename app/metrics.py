@@ -0,0 +1,127 @@
+import threading
+from bisect import bisect_left
+
+# Small in-process instruments. Updates take a short lock so they are safe
+# from the event loop and from threadpool workers alike.
+
+# Seconds; suits both pool checkout waits and request latencies
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = []
+        running = 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+
+        return {
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], cumulative)),
+            "count": running,
+            "sum": total,
+        }
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+
+class Family:
+    """One instrument per combination of label values, created on first use."""
+
+    def __init__(self, factory, *label_names: str):
+        self.factory = factory
+        self.label_names = label_names
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def child(self, *values):
+        # Plain dict read on the hot path; the lock is only for creation
+        instrument = self._children.get(values)
+        if instrument is None:
+            with self._lock:
+                instrument = self._children.setdefault(values, self.factory())
+        return instrument
+
+    def items(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+# ================= PROMETHEUS TEXT FORMAT =================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def exposition(name: str, kind: str, help: str, series) -> list[str]:
+    """
+    Text-format lines for one metric. ``series`` yields (label pairs,
+    instrument) where the instrument is a Counter, Gauge or Histogram, or a
+    plain number.
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+
+    for pairs, instrument in series:
+        pairs = list(pairs)
+        if isinstance(instrument, Histogram):
+            snap = instrument.snapshot()
+            for le, count in snap["buckets"].items():
+                lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {count}")
+            lines.append(f"{name}_sum{_labels(pairs)} {snap['sum']}")
+            lines.append(f"{name}_count{_labels(pairs)} {snap['count']}")
+        else:
+            value = getattr(instrument, "value", instrument)
+            lines.append(f"{name}{_labels(pairs)} {value}")
+
+    return lines
+
+
+def family_series(family: Family):
+    for values, instrument in family.items():
+        yield zip(family.label_names, values), instrument
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Text, Index, UniqueConstraint
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
 from datetime import datetime
 
@@ -29,7 +29,7 @@ class Address(Base):
     name = Column(String)
     mobile = Column(String)
     address_line = Column(String)
-    city = Column(String)
+    city = Column(String, index=True)
     pincode = Column(String)
 
     user = relationship("User", back_populates="addresses")
@@ -57,9 +57,45 @@ class Product(Base):
     description = Column(Text, nullable=True)
     image_url = Column(String)
 
+    # NULL stock = not tracked (always available). With stock_shards set the
+    # stock lives in product_stock_shards instead (see app/inventory.py).
+    stock = Column(Integer, nullable=True)
+    stock_shards = Column(Integer, nullable=True)
+
+    # name + description + category name, kept current by the admin handlers
+    # (app/search.py); Postgres GIN indexes on it are created by migration
+    search_document = deferred(Column(Text, nullable=True))
+
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     category = relationship("Category", back_populates="products")
 
+    # Keyset pagination indexes for the public catalog (see products/public_routes.py)
+    __table_args__ = (
+        Index("ix_products_category_id_id", "category_id", "id"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_category_id_price_id", "category_id", "price", "id"),
+    )
+
+
+# ================= INVENTORY =================
+
+class ProductStockShard(Base):
+    __tablename__ = "product_stock_shards"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    stock = Column(Integer, nullable=False, default=0)
+
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 
 # ================= ORDERS =================
 
@@ -68,15 +104,80 @@ class Order(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    items_json = Column(Text)
+    items_json = Column(Text)  # legacy; line items now live in order_items
     total_price = Column(Float)
     address_id = Column(Integer, ForeignKey("addresses.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     status = Column(String, default="Pending")
     tracking_number = Column(String, nullable=True)
 
     user = relationship("User", back_populates="orders")
     address = relationship("Address")
+    items = relationship(
+        "OrderItem",
+        back_populates="order",
+        cascade="all, delete-orphan",
+        order_by="OrderItem.id",
+    )
+
+    # Admin order list: newest-first keyset, optionally per status
+    __table_args__ = (
+        Index("ix_orders_status_id", "status", "id"),
+    )
+
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Kept on product deletion so order history survives; name/price are snapshots
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True, index=True)
+    name = Column(String)
+    price = Column(Float)
+    quantity = Column(Integer)
+
+    order = relationship("Order", back_populates="items")
+
+
+# ================= IDEMPOTENCY KEYS =================
+# Idempotency-Key header values seen on checkout, per user, so a retried
+# POST returns the order it already created. Rows expire and are purged by
+# `python -m app.cli purge-idempotency-keys`.
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+# ================= CHANGE STAMPS =================
+# Per-resource version counters for conditional GETs (app/etags.py)
+
+class ChangeStamp(Base):
+    __tablename__ = "change_stamps"
+
+    scope = Column(String(16), primary_key=True)
+    key = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# ================= DAILY SALES =================
+# Rollup of non-cancelled orders per UTC day, maintained by app/sales.py in
+# the same transaction as the order writes.
+
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)
+    # Checkouts spread their deltas over several rows per day so they don't
+    # all queue on one row lock; readers sum the shards
+    shard = Column(Integer, primary_key=True, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
 
 
 # ================= CART =================
@@ -85,7 +186,7 @@ class Cart(Base):
     __tablename__ = "carts"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, index=True)
     total_price = Column(Float, default=0.0)
 
     items = relationship("CartItem", back_populates="cart", cascade="all, delete")
@@ -102,3 +203,8 @@ class CartItem(Base):
     cart = relationship("Cart", back_populates="items")
     product = relationship("Product")
 
+    # One row per product per cart; add-to-cart upserts against it
+    __table_args__ = (
+        UniqueConstraint("cart_id", "product_id", name="uq_cart_items_cart_id_product_id"),
+    )
+
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from app.config import IDEMPOTENCY_KEY_TTL
+from app.models import IdempotencyKey, Order
+
+
+def lookup(user_id: int, key: str, now: datetime):
+    """Order previously created with this key, if the key hasn't expired."""
+    return (
+        select(Order)
+        .join(IdempotencyKey, IdempotencyKey.order_id == Order.id)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > now,
+        )
+    )
+
+
+def clear_expired(user_id: int, key: str, now: datetime):
+    # Lets a key be reused once its previous entry has expired
+    return delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at <= now,
+    )
+
+
+def new_key(user_id: int, key: str, order_id: int, now: datetime) -> IdempotencyKey:
+    return IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        order_id=order_id,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+    )
+
+
+def purge(db, now: datetime | None = None) -> int:
+    result = db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.expires_at <= (now or datetime.utcnow())
+    ))
+    return result.rowcount
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import contains_eager
+
+from app.models import Order, Address
+from app.pagination import encode_cursor, decode_cursor
+
+
+def serialize_items(items):
+    return [
+        {
+            "product_id": i.product_id,
+            "name": i.name,
+            "quantity": i.quantity,
+            "price": i.price,
+        }
+        for i in items
+    ]
+
+
+# ================= ADMIN ORDER LIST =================
+# Shared by /admin/orders, /admin/orders/export and /orders/all; the
+# statements run on either a sync Session or an AsyncSession.
+
+def admin_orders_query(
+    status: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    city: str | None = None,
+):
+    # User and address come back in the same statement as the order
+    q = (
+        select(Order)
+        .outerjoin(Order.user)
+        .outerjoin(Order.address)
+        .options(contains_eager(Order.user), contains_eager(Order.address))
+    )
+
+    if status:
+        q = q.where(Order.status == status)
+    if start:
+        q = q.where(Order.created_at >= start)
+    if end:
+        q = q.where(Order.created_at < end + timedelta(days=1))
+    if city:
+        q = q.where(Address.city == city)
+
+    return q
+
+
+def admin_order_page(q, limit: int, cursor: str | None = None):
+    """Newest-first keyset page of ``q``; split the rows with split_page()."""
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        q = q.where(Order.id < last_id)
+
+    # One extra row tells us whether another page exists
+    return q.order_by(Order.id.desc()).limit(limit + 1)
+
+
+def split_page(rows, limit: int):
+    """(orders, next_cursor) from the rows of an admin_order_page() query."""
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].id) if len(rows) > limit else None
+    return page, next_cursor
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.models import Address, Order, Cart, CartItem, User
-from app.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.models import Address, Order, OrderItem, Cart, CartItem, Product, User
+from app.database import get_async_db
 from app.deps import get_current_user
 from app.auth.utils import admin_required
-from datetime import datetime
-import json
+from app import etags, inventory, sales
+from app.orders import idempotency
+from app.schemas import AddressCreate, AddressOut
+from app.querybudget import query_budget
+from app.orders.listing import serialize_items, admin_orders_query, admin_order_page, split_page
+from datetime import date, datetime
 
-router = APIRouter(prefix="/orders", tags=["Orders"])
+router = APIRouter(prefix="/orders", tags=["Orders"], dependencies=[query_budget(4)])
 
 
 # ====================================================
@@ -15,40 +22,55 @@ router = APIRouter(prefix="/orders", tags=["Orders"])
 # ====================================================
 
 @router.get("/all")
-def admin_all_orders(
-    db: Session = Depends(get_db),
+async def admin_all_orders(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    status: str | None = None,
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    city: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
     _: User = Depends(admin_required)
 ):
-    orders = db.query(Order).order_by(Order.id.desc()).all()
+    q = admin_order_page(admin_orders_query(status, start, end, city), limit, cursor)
+    orders, next_cursor = split_page((await db.scalars(q)).all(), limit)
 
-    return [
-        {
-            "order_id": o.id,
-            "user_id": o.user_id,
-            "total_price": o.total_price,
-            "status": o.status,
-            "created_at": o.created_at.isoformat()
-        }
-        for o in orders
-    ]
+    return {
+        "items": [
+            {
+                "order_id": o.id,
+                "user_id": o.user_id,
+                "total_price": o.total_price,
+                "status": o.status,
+                "created_at": o.created_at.isoformat()
+            }
+            for o in orders
+        ],
+        "next_cursor": next_cursor,
+    }
 
 
 @router.patch("/{order_id}/status")
-def update_status(
+async def update_status(
     order_id: int,
     body: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _: User = Depends(admin_required)
 ):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.scalar(select(Order).where(Order.id == order_id).with_for_update())
 
     if not order:
         raise HTTPException(404, "Order not found")
 
+    old_status = order.status
     order.status = body.get("status", order.status)
 
-    db.commit()
-    db.refresh(order)
+    rollup = sales.status_changed(db, order, old_status, order.status)
+    if rollup is not None:
+        await db.execute(rollup)
+
+    await db.execute(etags.bump(db, etags.ORDERS, order.user_id))
+    await db.commit()
 
     return {"message": "Status updated", "status": order.status}
 
@@ -57,88 +79,147 @@ def update_status(
 # 2) USER ADDRESS ROUTES
 # ====================================================
 
-@router.post("/address")
-def save_address(
-    body: dict,
-    db: Session = Depends(get_db),
+@router.post("/address", response_model=AddressOut)
+async def save_address(
+    data: AddressCreate,
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user)
 ):
-    addr = Address(user_id=user.id, **body)
+    addr = Address(user_id=user.id, **data.model_dump())
 
     db.add(addr)
-    db.commit()
-    db.refresh(addr)
+    await db.commit()
 
-    return {
-        "id": addr.id,
-        "name": addr.name,
-        "mobile": addr.mobile,
-        "address_line": addr.address_line,
-        "city": addr.city,
-        "pincode": addr.pincode
-    }
+    return addr
 
 
-@router.get("/address")
-def get_addresses(
-    db: Session = Depends(get_db),
+@router.get("/address", response_model=list[AddressOut])
+async def get_addresses(
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user)
 ):
-    return db.query(Address).filter(Address.user_id == user.id).all()
+    return (await db.scalars(select(Address).where(Address.user_id == user.id))).all()
 
 
 # ====================================================
 # 3) CREATE ORDER
 # ====================================================
 
-@router.post("/create")
-def create_order(
+def _placed(order: Order, response: Response) -> dict:
+    # Replayed checkout: same body as the original response
+    response.headers["Idempotent-Replayed"] = "true"
+    return {"order_id": order.id, "total_price": order.total_price}
+
+
+# One stock UPDATE per cart line (app/inventory.py), so no fixed statement budget
+@router.post("/create", dependencies=[query_budget(None)])
+async def create_order(
     address_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    idempotency_key: str | None = Header(None, max_length=64),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user)
 ):
-    cart = db.query(Cart).filter(Cart.user_id == user.id).first()
+    now = datetime.utcnow()
+
+    # Fast path for retries of a checkout that already went through
+    if idempotency_key:
+        order = await db.scalar(idempotency.lookup(user.id, idempotency_key, now))
+        if order:
+            return _placed(order, response)
 
-    if not cart or not cart.items:
+    # Serialises concurrent checkouts (and retries) of the same cart
+    cart_id = await db.scalar(
+        select(Cart.id).where(Cart.user_id == user.id).with_for_update()
+    )
+
+    # A retry that waited on the lock finds the order its twin just placed
+    if idempotency_key:
+        order = await db.scalar(idempotency.lookup(user.id, idempotency_key, now))
+        if order:
+            # Build the body first: rollback expires the loaded order
+            placed = _placed(order, response)
+            await db.rollback()
+            return placed
+
+    # Items, current product prices and stock columns in one statement
+    rows = [] if cart_id is None else (await db.execute(
+        select(
+            CartItem.product_id,
+            CartItem.quantity,
+            Product.name,
+            Product.price,
+            Product.stock,
+            Product.stock_shards,
+        )
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.cart_id == cart_id)
+        .order_by(CartItem.id)
+    )).all()
+
+    if not rows:
         raise HTTPException(400, "Cart is empty")
+    if any(r.quantity <= 0 for r in rows):
+        raise HTTPException(400, "Invalid quantity in cart")
 
-    address = db.query(Address).filter(
+    address = await db.scalar(select(Address.id).where(
         Address.id == address_id,
         Address.user_id == user.id
-    ).first()
+    ))
 
     if not address:
         raise HTTPException(404, "Address not found")
 
-    items_data = []
-    total = 0
+    short = await inventory.take_for_order(db, user.id, rows, now)
+    if short:
+        await db.rollback()
+        raise HTTPException(409, f"Out of stock: {short}")
 
-    for item in cart.items:
-        items_data.append({
-            "product_id": item.product_id,
-            "name": item.product.name,
-            "quantity": item.quantity,
-            "price": item.product.price
-        })
-        total += item.quantity * item.product.price
+    items_data = [
+        {"product_id": r.product_id, "name": r.name, "quantity": r.quantity, "price": r.price}
+        for r in rows
+    ]
+    total = sum(item["quantity"] * item["price"] for item in items_data)
 
     order = Order(
         user_id=user.id,
-        items_json=json.dumps(items_data),
         total_price=total,
         address_id=address_id,
-        created_at=datetime.utcnow(),
+        created_at=now,
         status="Pending"
     )
 
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.flush()
 
-    # Clear cart
-    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-    cart.total_price = 0
-    db.commit()
+    # One executemany for all line items
+    await db.execute(
+        insert(OrderItem),
+        [dict(order_id=order.id, **item) for item in items_data],
+    )
+    await db.execute(sales.order_placed(db, order))
+
+    # Clear cart in the same transaction
+    await db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+    await db.execute(update(Cart).where(Cart.id == cart_id).values(total_price=0))
+    await db.execute(etags.bump(db, etags.CART, user.id))
+    await db.execute(etags.bump(db, etags.ORDERS, user.id))
+
+    if idempotency_key:
+        await db.execute(idempotency.clear_expired(user.id, idempotency_key, now))
+        db.add(idempotency.new_key(user.id, idempotency_key, order.id, now))
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race on the key where the database has no row locks (SQLite)
+        await db.rollback()
+        if not idempotency_key:
+            raise
+        order = await db.scalar(idempotency.lookup(user.id, idempotency_key, now))
+        if not order:
+            raise
+        return _placed(order, response)
 
     return {"order_id": order.id, "total_price": total}
 
@@ -148,13 +229,20 @@ def create_order(
 # ====================================================
 
 @router.get("/my")
-def get_my_orders(
-    db: Session = Depends(get_db),
+async def get_my_orders(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user)
 ):
-    orders = db.query(Order).filter(
+    etag = await etags.stamp_etag(db, (etags.ORDERS, user.id))
+    if etags.matches(request, etag):
+        return etags.not_modified(ETag=etag)
+    response.headers["ETag"] = etag
+
+    orders = (await db.scalars(select(Order).where(
         Order.user_id == user.id
-    ).order_by(Order.id.desc()).all()
+    ).order_by(Order.id.desc()))).all()
 
     return [
         {
@@ -172,28 +260,26 @@ def get_my_orders(
 # ====================================================
 
 @router.get("/{order_id}")
-def get_order(
+async def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user)
 ):
-    order = db.query(Order).filter(
+    order = await db.scalar(select(Order).options(selectinload(Order.items)).where(
         Order.id == order_id,
         Order.user_id == user.id
-    ).first()
+    ))
 
     if not order:
         raise HTTPException(404, "Order not found")
 
-    address = db.query(Address).filter(
-        Address.id == order.address_id
-    ).first()
+    address = await db.get(Address, order.address_id)
 
     return {
         "order_id": order.id,
         "total_price": order.total_price,
         "status": order.status,
-        "items": json.loads(order.items_json),
+        "items": serialize_items(order.items),
         "address": {
             "name": address.name,
             "mobile": address.mobile,
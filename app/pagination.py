@@ -0,0 +1,41 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+# Opaque keyset cursors: the values of the sort key of the last row on the
+# page, encoded so clients treat them as tokens rather than parameters.
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _typed(value, type_):
+    # bool is an int subclass but never a valid key
+    if isinstance(value, bool):
+        raise ValueError
+    if type_ is int and isinstance(value, int):
+        return value
+    if type_ is float and isinstance(value, (int, float)):
+        return value
+    if type_ is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    raise ValueError
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """
+    Values of a cursor, one per entry of ``types`` (int, float or datetime),
+    so a forged cursor is a 400 rather than a type error in the database.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [_typed(v, t) for v, t in zip(values, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
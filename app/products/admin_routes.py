@@ -1,21 +1,20 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from sqlalchemy.orm import Session, joinedload
-import os
-import shutil
 
 from app.database import get_db
 from app.models import Product, Category
 from app.auth.utils import admin_required
+from app.cache import catalog_cache
+from app.schemas import AdminProductOut, StockUpdate
+from app import etags, images, inventory, search
+from app.querybudget import query_budget
 
-router = APIRouter(prefix="/admin/products", tags=["Admin Products"])
-
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+router = APIRouter(prefix="/admin/products", tags=["Admin Products"], dependencies=[query_budget(4)])
 
 
 # ---------------- LIST ----------------
 
-@router.get("")
+@router.get("", response_model=list[AdminProductOut])
 def list_products(
     db: Session = Depends(get_db),
     _: str = Depends(admin_required),
@@ -29,7 +28,7 @@ def list_products(
 
 # ---------------- ADD ----------------
 
-@router.post("")
+@router.post("", response_model=AdminProductOut, dependencies=[query_budget(7)])
 def add_product(
     name: str = Form(...),
     price: float = Form(...),
@@ -39,21 +38,12 @@ def add_product(
     db: Session = Depends(get_db),
     _: str = Depends(admin_required),
 ):
-    image_url = None
-
-    if image:
-        filename = image.filename
-        path = os.path.join(UPLOAD_DIR, filename)
-
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-
-        image_url = f"/uploads/{filename}"
-
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
         raise HTTPException(400, "Invalid category")
 
+    image_url = images.save_upload(image) if image else None
+
     product = Product(
         name=name,
         price=price,
@@ -63,15 +53,20 @@ def add_product(
     )
 
     db.add(product)
+    db.flush()
+    db.execute(search.refresh_documents(Product.id == product.id))
+    db.execute(etags.bump(db, etags.CATALOG))
     db.commit()
     db.refresh(product)
+    search.touched(product.id)
+    catalog_cache.invalidate()
 
     return product
 
 
 # ---------------- UPDATE ----------------
 
-@router.put("/{product_id}")
+@router.put("/{product_id}", response_model=AdminProductOut, dependencies=[query_budget(7)])
 def update_product(
     product_id: int,
     name: str = Form(...),
@@ -93,16 +88,15 @@ def update_product(
     product.category_id = category_id
 
     if image:
-        filename = image.filename
-        path = os.path.join(UPLOAD_DIR, filename)
-
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-
-        product.image_url = f"/uploads/{filename}"
+        product.image_url = images.save_upload(image)
 
+    db.flush()
+    db.execute(search.refresh_documents(Product.id == product.id))
+    db.execute(etags.bump(db, etags.CATALOG))
     db.commit()
     db.refresh(product)
+    search.touched(product.id)
+    catalog_cache.invalidate()
 
     return product
 
@@ -121,7 +115,47 @@ def delete_product(
         raise HTTPException(404, "Not found")
 
     db.delete(product)
+    db.execute(etags.bump(db, etags.CATALOG))
     db.commit()
+    search.touched(product_id)
+    catalog_cache.invalidate()
 
     return {"success": True}
 
+
+
+# ---------------- STOCK ----------------
+
+@router.get("/{product_id}/stock")
+def get_stock(
+    product_id: int,
+    db: Session = Depends(get_db),
+    _: str = Depends(admin_required),
+):
+    product = db.get(Product, product_id)
+
+    if not product:
+        raise HTTPException(404, "Product not found")
+
+    return inventory.stock_level(db, product)
+
+
+@router.put("/{product_id}/stock", dependencies=[query_budget(9)])
+def set_stock(
+    product_id: int,
+    data: StockUpdate,
+    db: Session = Depends(get_db),
+    _: str = Depends(admin_required),
+):
+    product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
+
+    if not product:
+        raise HTTPException(404, "Product not found")
+
+    if data.shards and data.stock is None:
+        raise HTTPException(400, "Sharded stock needs a stock level")
+
+    inventory.set_stock(db, product, data.stock, data.shards)
+    db.commit()
+
+    return inventory.stock_level(db, product)
@@ -1,35 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Literal
 
-from app.database import get_db
-from app.models import Category
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.models import Category, Product
 from app.auth.utils import admin_required
+from app.cache import catalog_cache
+from app.products.public_routes import load_products
+from app.schemas import CategoryOut, CategoryCountOut, ProductPage
+from app.compression import render
+from app import etags
+from app.querybudget import query_budget
 
-router = APIRouter(prefix="/categories", tags=["Categories"])
+router = APIRouter(prefix="/categories", tags=["Categories"], dependencies=[query_budget(3)])
 
 
 # ----- PUBLIC -----
-@router.get("")
-def list_categories(db: Session = Depends(get_db)):
-    return db.query(Category).all()
+# The body is rendered by hand for the cache, so the schema is documented
+# through responses= rather than a response_model FastAPI would never apply
+@router.get("", responses={200: {
+    "model": list[CategoryCountOut] | list[CategoryOut],
+    "description": "Categories; each carries product_count when with_counts=true",
+}})
+async def list_categories(request: Request, with_counts: bool = False, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        categories = [
+            CategoryOut.model_construct(id=c.id, name=c.name)
+            for c in await db.scalars(select(Category))
+        ]
+        return render(categories, list[CategoryOut])
+
+    async def load_with_counts():
+        # One GROUP BY; counting uses the products (category_id, id) index
+        rows = await db.execute(
+            select(Category.id, Category.name, func.count(Product.id))
+            .outerjoin(Product, Product.category_id == Category.id)
+            .group_by(Category.id, Category.name)
+        )
+        categories = [
+            CategoryCountOut.model_construct(id=id, name=name, product_count=count)
+            for id, name, count in rows
+        ]
+        return render(categories, list[CategoryCountOut])
+
+    if with_counts:
+        body = await catalog_cache.aget_or_load(("categories", "counts"), load_with_counts)
+    else:
+        body = await catalog_cache.aget_or_load(("categories",), load)
+    return await body.response(request)
+
+
+@router.get("/{category_id}/products", response_model=ProductPage)
+async def category_products(
+    request: Request,
+    category_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    sort: Literal["newest", "price_asc", "price_desc"] = "newest",
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def load():
+        if await db.get(Category, category_id) is None:
+            return None
+        page = await load_products(db, limit, cursor, category_id, None, None, sort)
+        return render(page, ProductPage)
+
+    body = await catalog_cache.aget_or_load(
+        ("category_products", category_id, limit, cursor, sort), load
+    )
+    if body is None:
+        raise HTTPException(404, "Category not found")
+
+    return await body.response(request)
 
 
 # ----- ADMIN -----
-@router.post("")
-def create_category(
+@router.post("", response_model=CategoryOut, dependencies=[query_budget(4)])
+async def create_category(
     name: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(admin_required),
 ):
-    existing = db.query(Category).filter(Category.name == name).first()
+    existing = await db.scalar(select(Category).where(Category.name == name))
 
     if existing:
         raise HTTPException(400, "Category already exists")
 
     cat = Category(name=name)
     db.add(cat)
-    db.commit()
-    db.refresh(cat)
+    await db.execute(etags.bump(db, etags.CATALOG))
+    await db.commit()
+    catalog_cache.invalidate()
 
-    return cat
+    return {"id": cat.id, "name": cat.name}
 
@@ -1,18 +1,124 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models import Product
+from app.pagination import encode_cursor, decode_cursor
+from app.cache import catalog_cache, search_cache
+from app.images import image_variants
+from app import search
+from app.schemas import ProductOut, ProductPage
+from app.compression import render
+from app.querybudget import query_budget
+
+router = APIRouter(prefix="/products", dependencies=[query_budget(3)])
+
+
+def serialize_product(p: Product) -> ProductOut:
+    # Straight from the DB: already valid, so skip per-object validation
+    return ProductOut.model_construct(
+        id=p.id,
+        name=p.name,
+        price=p.price,
+        description=p.description,
+        image_url=p.image_url,
+        images=image_variants(p.image_url),
+        category_id=p.category_id,
+    )
+
+
+@router.get("/search", response_model=ProductPage)
+async def search_products(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Relevance order has no stable keyset, so the cursor wraps an offset
+    offset = decode_cursor(cursor, int)[0] if cursor else 0
+    if offset < 0:
+        raise HTTPException(400, "Invalid cursor")
+
+    async def load():
+        rows = await search.search(db, q, limit + 1, offset)
+        page = ProductPage.model_construct(
+            items=[serialize_product(p) for p in rows[:limit]],
+            next_cursor=encode_cursor(offset + limit) if len(rows) > limit else None,
+        )
+        return render(page, ProductPage)
+
+    key = (catalog_cache.version, q.strip().lower(), limit, offset)
+    body = await search_cache.aget_or_load(key, load)
+    return await body.response(request)
+
+
+# Every sort order ends in Product.id so the keyset is unique and each page
+# is a single range scan on one of the products indexes.
+@router.get("", response_model=ProductPage)
+async def list_products(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    category_id: int | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    sort: Literal["newest", "price_asc", "price_desc"] = "newest",
+    db: AsyncSession = Depends(get_async_db),
+):
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(400, "min_price must not exceed max_price")
+
+    async def load():
+        page = await load_products(db, limit, cursor, category_id, min_price, max_price, sort)
+        return render(page, ProductPage)
+
+    key = ("products", limit, cursor, category_id, min_price, max_price, sort)
+    body = await catalog_cache.aget_or_load(key, load)
+    return await body.response(request)
+
+
+async def load_products(db, limit, cursor, category_id, min_price, max_price, sort) -> ProductPage:
+    q = select(Product)
+
+    if category_id is not None:
+        q = q.where(Product.category_id == category_id)
+    if min_price is not None:
+        q = q.where(Product.price >= min_price)
+    if max_price is not None:
+        q = q.where(Product.price <= max_price)
 
-router = APIRouter(prefix="/products")
+    if sort == "newest":
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            q = q.where(Product.id < last_id)
+        q = q.order_by(Product.id.desc())
+    elif sort == "price_asc":
+        if cursor:
+            last_price, last_id = decode_cursor(cursor, float, int)
+            q = q.where(tuple_(Product.price, Product.id) > tuple_(last_price, last_id))
+        q = q.order_by(Product.price.asc(), Product.id.asc())
+    else:
+        if cursor:
+            last_price, last_id = decode_cursor(cursor, float, int)
+            q = q.where(tuple_(Product.price, Product.id) < tuple_(last_price, last_id))
+        q = q.order_by(Product.price.desc(), Product.id.desc())
 
-def db():
-    d = SessionLocal()
-    try:
-        yield d
-    finally:
-        d.close()
+    # One extra row tells us whether another page exists without a COUNT(*)
+    rows = (await db.scalars(q.limit(limit + 1))).all()
+    page = rows[:limit]
 
-@router.get("")
-def list_products(db: Session = Depends(db)):
-    return db.query(Product).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        if sort == "newest":
+            next_cursor = encode_cursor(last.id)
+        else:
+            next_cursor = encode_cursor(last.price, last.id)
 
+    return ProductPage.model_construct(
+        items=[serialize_product(p) for p in page],
+        next_cursor=next_cursor,
+    )
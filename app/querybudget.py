@@ -0,0 +1,133 @@
+import logging
+
+from fastapi import Depends
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.config import QUERY_BUDGET_MODE, QUERY_REPEAT_LIMIT
+from app.database import async_engine, engine
+from app.telemetry import _route, request_stats
+
+# Per-request SQL budgets and N+1 detection, on top of the statement counter
+# in app/telemetry.py. Routes declare how many statements they may run:
+#
+#     @router.get("", dependencies=[query_budget(3)])
+#
+# (a router-level budget is overridden by one on the endpoint). Separately,
+# any request that runs the same SELECT more than QUERY_REPEAT_LIMIT times
+# with different parameters is reported as an N+1, budget or not. Repeated
+# writes are left alone: stock is taken with one conditional UPDATE per
+# line on purpose (app/inventory.py).
+#
+# QUERY_BUDGET_MODE decides what happens to an offending request:
+#   log    - a warning naming the route and the repeated statement
+#   header - X-Query-Count / X-Query-Budget / X-Query-Max-Repeat on every
+#            response, plus the warning
+#   raise  - QueryBudgetExceeded from the statement that broke the budget
+#   off    - nothing is registered; the default
+
+logger = logging.getLogger(__name__)
+
+ENABLED = QUERY_BUDGET_MODE in ("log", "header", "raise")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(statements: int | None, repeats: int | None = QUERY_REPEAT_LIMIT):
+    """
+    Dependency declaring the SQL budget for an endpoint or router. None
+    lifts a cap: ``statements`` for endpoints whose count grows with the
+    cart, ``repeats`` for batched reads such as exports.
+    """
+    async def declare():
+        stats = request_stats.get()
+        if stats is not None:
+            stats.budget = statements
+            stats.repeat_limit = repeats
+
+    return Depends(declare)
+
+
+# ================= SQL EVENTS =================
+
+def _check(conn, cursor, statement, parameters, context, executemany):
+    # Registered after app/telemetry.py's listener, so stats.statements
+    # already includes this statement
+    stats = request_stats.get()
+    if stats is None or stats.repeats is None:
+        return
+
+    seen = 0
+    if statement.lstrip()[:6].upper() == "SELECT":
+        seen = stats.repeats.get(statement, 0) + 1
+        stats.repeats[statement] = seen
+
+    if QUERY_BUDGET_MODE != "raise":
+        return
+
+    if stats.budget is not None and stats.statements > stats.budget:
+        raise QueryBudgetExceeded(
+            f"{stats.statements} SQL statements, budget is {stats.budget}: {statement}"
+        )
+    if stats.repeat_limit is not None and seen > stats.repeat_limit:
+        raise QueryBudgetExceeded(f"N+1: statement run {seen} times: {statement}")
+
+
+if ENABLED:
+    event.listen(engine, "after_cursor_execute", _check)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", _check)
+
+
+# ================= MIDDLEWARE =================
+
+def _worst_repeat(stats) -> tuple[str | None, int]:
+    if not stats.repeats:
+        return None, 0
+    statement = max(stats.repeats, key=stats.repeats.get)
+    return statement, stats.repeats[statement]
+
+
+def _report(scope, stats):
+    statement, repeated = _worst_repeat(stats)
+    over_budget = stats.budget is not None and stats.statements > stats.budget
+    n_plus_one = stats.repeat_limit is not None and repeated > stats.repeat_limit
+
+    if over_budget or n_plus_one:
+        logger.warning(
+            "%s %s ran %d SQL statements (budget %s); most repeated, %d times: %s",
+            scope["method"], _route(scope), stats.statements, stats.budget,
+            repeated, statement,
+        )
+
+
+class QueryBudgetMiddleware:
+    """Reports budget overruns; sits inside MetricsMiddleware, which sets up request_stats."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        stats = request_stats.get()
+        if scope["type"] != "http" or stats is None:
+            await self.app(scope, receive, send)
+            return
+
+        stats.repeats = {}
+        stats.repeat_limit = QUERY_REPEAT_LIMIT
+
+        async def send_with_counts(message):
+            # Statements run while streaming the body aren't in the headers
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Count"] = str(stats.statements)
+                headers["X-Query-Max-Repeat"] = str(_worst_repeat(stats)[1])
+                if stats.budget is not None:
+                    headers["X-Query-Budget"] = str(stats.budget)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_counts if QUERY_BUDGET_MODE == "header" else send)
+        finally:
+            _report(scope, stats)
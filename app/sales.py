@@ -0,0 +1,112 @@
+from datetime import date, timedelta
+
+from sqlalchemy import delete, func, insert, literal, or_, select
+
+from app.database import dialect_insert
+from app.models import DailySales, Order
+
+# Orders in this status are excluded from revenue and counts
+CANCELLED = "Cancelled"
+
+# Rollup rows per day. An order always lands on shard order.id % SHARDS, so
+# concurrent checkouts only contend when their ids collide modulo SHARDS.
+# Any value works: readers sum every shard of a day.
+SHARDS = 16
+
+
+def _counts(status) -> bool:
+    return status != CANCELLED
+
+
+def daily_sales_delta(db, day: date, shard: int, orders: int, revenue: float):
+    """Statement adding ``orders``/``revenue`` to one rollup row for ``day``."""
+    insert_ = dialect_insert(db)
+    stmt = insert_(DailySales).values(day=day, shard=shard, order_count=orders, revenue=revenue)
+    return stmt.on_conflict_do_update(
+        index_elements=[DailySales.day, DailySales.shard],
+        set_={
+            "order_count": DailySales.order_count + stmt.excluded.order_count,
+            "revenue": DailySales.revenue + stmt.excluded.revenue,
+        },
+    )
+
+
+def order_placed(db, order: Order):
+    return daily_sales_delta(db, order.created_at.date(), order.id % SHARDS, 1, order.total_price)
+
+
+def status_changed(db, order: Order, old_status, new_status):
+    """Rollup delta for a status change, or None if it doesn't affect totals."""
+    if _counts(old_status) == _counts(new_status):
+        return None
+
+    sign = 1 if _counts(new_status) else -1
+    return daily_sales_delta(
+        db, order.created_at.date(), order.id % SHARDS, sign, sign * order.total_price
+    )
+
+
+# ================= REBUILD =================
+
+def rebuild(db, since: date | None = None):
+    """Recompute rollup rows (all days, or from ``since`` onward) from orders."""
+    day = func.date(Order.created_at)
+
+    clear = delete(DailySales)
+    # Rebuilt days come back as a single shard 0 row
+    source = (
+        select(
+            day,
+            literal(0),
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.total_price), 0),
+        )
+        .where(or_(Order.status.is_(None), Order.status != CANCELLED))
+        .group_by(day)
+    )
+
+    if since is not None:
+        clear = clear.where(DailySales.day >= since)
+        source = source.where(Order.created_at >= since)
+
+    db.execute(clear)
+    db.execute(
+        insert(DailySales).from_select(
+            ["day", "shard", "order_count", "revenue"], source
+        )
+    )
+
+
+# ================= TIMESERIES =================
+
+def _bucket(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def timeseries(db, start: date, end: date, granularity: str = "day") -> list[dict]:
+    rows = db.execute(
+        select(DailySales.day, func.sum(DailySales.order_count), func.sum(DailySales.revenue))
+        .where(DailySales.day >= start, DailySales.day <= end)
+        .group_by(DailySales.day)
+        .order_by(DailySales.day)
+    ).all()
+
+    buckets = {}
+    for day, order_count, revenue in rows:
+        b = buckets.setdefault(_bucket(day, granularity), [0, 0.0])
+        b[0] += order_count
+        b[1] += revenue
+
+    return [
+        {
+            "period": period.isoformat(),
+            "orders": orders,
+            "revenue": revenue,
+            "avg_basket": revenue / orders if orders else 0,
+        }
+        for period, (orders, revenue) in buckets.items()
+    ]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
 class SignupRequest(BaseModel):
     name: str
@@ -15,3 +15,85 @@ class AddressCreate(BaseModel):
     address_line: str
     city: str
     pincode: str
+
+class CartSyncItem(BaseModel):
+    product_id: int
+    quantity: int = Field(ge=1)
+
+class CartSync(BaseModel):
+    items: list[CartSyncItem]
+
+class StockUpdate(BaseModel):
+    stock: int | None = Field(None, ge=0)  # None stops tracking stock
+    shards: int = Field(0, ge=0, le=64)
+
+
+# ================= RESPONSES =================
+# from_attributes lets handlers return ORM rows directly; FastAPI then
+# serialises through the model in pydantic-core instead of reflecting over
+# the objects with jsonable_encoder.
+
+class ORMModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+class CategoryOut(ORMModel):
+    id: int
+    name: str
+
+class CategoryCountOut(CategoryOut):
+    product_count: int
+
+class ProductOut(ORMModel):
+    id: int
+    name: str
+    price: float
+    description: str | None = None
+    image_url: str | None = None
+    images: dict[str, str] | None = None
+    category_id: int | None = None
+
+class ProductPage(BaseModel):
+    items: list[ProductOut]
+    next_cursor: str | None = None
+
+class AdminProductOut(ORMModel):
+    id: int
+    name: str
+    price: float
+    description: str | None = None
+    image_url: str | None = None
+    category_id: int | None = None
+    category: CategoryOut | None = None
+    stock: int | None = None
+    stock_shards: int | None = None
+
+class UserOut(ORMModel):
+    id: int
+    name: str | None = None
+    mobile: str | None = None
+    role: str | None = None
+
+class AddressOut(ORMModel):
+    id: int
+    name: str | None = None
+    mobile: str | None = None
+    address_line: str | None = None
+    city: str | None = None
+    pincode: str | None = None
+
+class CartProductOut(BaseModel):
+    id: int
+    name: str
+    price: float
+    image_url: str
+    images: dict[str, str] | None = None
+
+class CartItemOut(BaseModel):
+    id: int
+    quantity: int
+    product: CartProductOut
+
+class CartOut(BaseModel):
+    cart_id: int | None = None
+    items: list[CartItemOut]
+    total_price: float
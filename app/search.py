@@ -0,0 +1,177 @@
+import asyncio
+import difflib
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from sqlalchemy import func, literal, literal_column, or_, select, update
+
+from app.models import Category, Product
+
+# Product search over name, description and category name.
+#
+# Each product carries a denormalised products.search_document, rewritten by
+# the admin product handlers in the same transaction as the product. On
+# Postgres it is matched through two GIN indexes (see the migration):
+#   - to_tsvector('simple', search_document) for whole words and prefixes
+#   - search_document gin_trgm_ops for typo-tolerant word similarity
+# Other databases (SQLite in local runs) use an in-process inverted index
+# that is loaded once and then patched for the products the handlers touch.
+
+MAX_TERMS = 8
+
+# Must match the expression the tsvector index was built on
+_CONFIG = literal_column("'simple'::regconfig")
+
+
+def terms(text: str | None) -> list[str]:
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def document_expr():
+    category = (
+        select(Category.name)
+        .where(Category.id == Product.category_id)
+        .scalar_subquery()
+    )
+    return (
+        Product.name
+        + " " + func.coalesce(Product.description, "")
+        + " " + func.coalesce(category, "")
+    )
+
+
+def refresh_documents(*where):
+    """UPDATE rewriting search_document for the products matching ``where``."""
+    return update(Product).where(*where).values(search_document=document_expr())
+
+
+def touched(*product_ids: int):
+    # Call after commit; only the in-process index needs telling
+    memory_index.mark_dirty(product_ids)
+
+
+# ================= POSTGRES =================
+
+def _pg_search(q: str, words: list[str], limit: int, offset: int):
+    tsv = func.to_tsvector(_CONFIG, Product.search_document)
+    tsq = func.to_tsquery(_CONFIG, " & ".join(f"{w}:*" for w in words))
+    similarity = func.word_similarity(q, Product.search_document)
+
+    return (
+        select(Product)
+        .where(or_(
+            tsv.op("@@")(tsq),
+            literal(q).op("<%")(Product.search_document),
+        ))
+        .order_by((func.ts_rank(tsv, tsq) + similarity).desc(), Product.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+# ================= IN-MEMORY FALLBACK =================
+
+class _MemoryIndex:
+    def __init__(self):
+        self.loaded = False
+        self._docs = {}                  # product id -> set of terms
+        self._postings = defaultdict(set)  # term -> product ids
+        self._vocab = []                 # sorted terms, for prefix lookups
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._sync_lock = asyncio.Lock()
+
+    def mark_dirty(self, product_ids):
+        with self._lock:
+            self._dirty.update(product_ids)
+
+    def _remove(self, product_id):
+        for term in self._docs.pop(product_id, ()):
+            ids = self._postings[term]
+            ids.discard(product_id)
+            if not ids:
+                del self._postings[term]
+                self._vocab.pop(bisect_left(self._vocab, term))
+
+    def _add(self, product_id, document):
+        self._remove(product_id)
+        words = set(terms(document))
+        self._docs[product_id] = words
+        for term in words:
+            if term not in self._postings:
+                insort(self._vocab, term)
+            self._postings[term].add(product_id)
+
+    async def sync(self, db):
+        async with self._sync_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+
+            if not self.loaded:
+                q = select(Product.id, Product.search_document)
+            elif dirty:
+                q = select(Product.id, Product.search_document).where(Product.id.in_(dirty))
+            else:
+                return
+
+            rows = (await db.execute(q)).all()
+            for product_id in dirty:
+                self._remove(product_id)
+            for product_id, document in rows:
+                self._add(product_id, document)
+            self.loaded = True
+
+    def _matches(self, word) -> dict[int, int]:
+        scores = {}
+
+        # Prefix matches (exact words score higher)
+        i = bisect_left(self._vocab, word)
+        while i < len(self._vocab) and self._vocab[i].startswith(word):
+            term = self._vocab[i]
+            for product_id in self._postings[term]:
+                scores[product_id] = max(scores.get(product_id, 0), 3 if term == word else 2)
+            i += 1
+
+        # Typos
+        for term in difflib.get_close_matches(word, self._vocab, n=5, cutoff=0.75):
+            for product_id in self._postings[term]:
+                scores.setdefault(product_id, 1)
+
+        return scores
+
+    def search(self, words: list[str]) -> list[int]:
+        total = None
+        for word in words:
+            scores = self._matches(word)
+            if total is None:
+                total = scores
+            else:
+                total = {pid: total[pid] + s for pid, s in scores.items() if pid in total}
+            if not total:
+                return []
+
+        return sorted(total, key=lambda pid: (-total[pid], -pid))
+
+
+memory_index = _MemoryIndex()
+
+
+# ================= QUERY =================
+
+async def search(db, q: str, limit: int, offset: int) -> list[Product]:
+    words = terms(q)[:MAX_TERMS]
+    if not words:
+        return []
+
+    if db.get_bind().dialect.name == "postgresql":
+        return (await db.scalars(_pg_search(" ".join(words), words, limit, offset))).all()
+
+    await memory_index.sync(db)
+    ids = memory_index.search(words)[offset:offset + limit]
+    if not ids:
+        return []
+
+    products = {p.id: p for p in await db.scalars(select(Product).where(Product.id.in_(ids)))}
+    return [products[i] for i in ids if i in products]
@@ -0,0 +1,41 @@
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# uploads/<sha256>.<ext> and its uploads/<sha256>_<variant>.webp files
+# (app/images.py) never change once written, so clients and CDNs may keep
+# them forever and the hash doubles as a strong ETag.
+_CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})(?:_[a-z]+)?$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Files from before content-addressed uploads; may still be replaced
+MUTABLE = "public, max-age=3600, must-revalidate"
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    StaticFiles with a cache policy for /uploads. Range requests,
+    Content-Length from the stat result and zero-copy sends (on servers that
+    support the pathsend extension) come from Starlette's FileResponse.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        stem = os.path.splitext(os.path.basename(full_path))[0]
+        match = _CONTENT_ADDRESSED.match(stem)
+
+        headers = {"cache-control": IMMUTABLE if match else MUTABLE}
+        if match:
+            headers["etag"] = f'"{stem}"'
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
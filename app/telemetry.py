@@ -0,0 +1,232 @@
+import secrets
+import time
+from contextvars import ContextVar
+
+import anyio.to_thread
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+from app.auth import hashing
+from app.config import METRICS_TOKEN
+from app.database import async_engine, engine, pool_status
+from app.metrics import Counter, Family, Gauge, Histogram, exposition, family_series
+
+# Request and database metrics, served in Prometheus text format at
+# GET /metrics. Every update is an attribute bump or a bucket increment on an
+# instrument that already exists; a lock is only taken the first time a
+# route/status combination is seen.
+
+# Statements per request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+UNMATCHED = "<unmatched>"
+
+
+class _RequestStats:
+    __slots__ = ("statements", "db_seconds", "budget", "repeat_limit", "repeats")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        # Filled in by app/querybudget.py when it is enabled
+        self.budget = None
+        self.repeat_limit = None
+        self.repeats = None
+
+
+# Set by MetricsMiddleware. Threadpool handlers run in a copy of the context,
+# so they see (and add to) the same object.
+request_stats: ContextVar[_RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+in_flight = Gauge()
+requests_total = Family(Counter, "method", "route", "status")
+request_duration = Family(Histogram, "method", "route")
+request_statements = Family(lambda: Histogram(STATEMENT_BUCKETS), "method", "route")
+request_db_seconds = Family(Histogram, "method", "route")
+
+statements_total = {"sync": Counter(), "async": Counter()}
+statement_duration = {"sync": Histogram(), "async": Histogram()}
+
+
+# ================= SQL EVENTS =================
+
+def _listen(eng, name):
+    count = statements_total[name]
+    duration = statement_duration[name]
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        count.inc()
+        duration.observe(elapsed)
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    def failed(ctx):
+        # A statement that raised never reaches ``after``
+        if ctx.statement is not None and ctx.connection is not None:
+            starts = ctx.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+    event.listen(eng, "before_cursor_execute", before)
+    event.listen(eng, "after_cursor_execute", after)
+    event.listen(eng, "handle_error", failed)
+
+
+_listen(engine, "sync")
+_listen(async_engine.sync_engine, "async")
+
+
+# ================= MIDDLEWARE =================
+
+def _route(scope) -> str:
+    # The router stores the matched route in the scope; label by its
+    # template so /products/12 and /products/13 share a series
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = _RequestStats()
+        token = request_stats.set(stats)
+        in_flight.inc()
+        start = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            request_stats.reset(token)
+
+            method = scope["method"]
+            route = _route(scope)
+            requests_total.child(method, route, str(status)).inc()
+            request_duration.child(method, route).observe(elapsed)
+            request_statements.child(method, route).observe(stats.statements)
+            request_db_seconds.child(method, route).observe(stats.db_seconds)
+
+
+# ================= ENDPOINT =================
+
+router = APIRouter(tags=["Metrics"])
+
+
+def _check_token(request: Request):
+    if METRICS_TOKEN is None:
+        raise HTTPException(404, "Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token, METRICS_TOKEN):
+        raise HTTPException(401, "Invalid metrics token")
+
+
+def render() -> str:
+    lines = []
+    lines += exposition(
+        "http_requests_in_flight", "gauge",
+        "Requests currently being handled.",
+        [((), in_flight)],
+    )
+    lines += exposition(
+        "http_requests_total", "counter",
+        "Requests by method, route template and status code.",
+        family_series(requests_total),
+    )
+    lines += exposition(
+        "http_request_duration_seconds", "histogram",
+        "Request latency by route.",
+        family_series(request_duration),
+    )
+    lines += exposition(
+        "http_request_db_statements", "histogram",
+        "SQL statements executed per request.",
+        family_series(request_statements),
+    )
+    lines += exposition(
+        "http_request_db_seconds", "histogram",
+        "Time spent in SQL statements per request.",
+        family_series(request_db_seconds),
+    )
+    lines += exposition(
+        "db_statements_total", "counter",
+        "SQL statements executed, by engine.",
+        [((("engine", name),), c) for name, c in statements_total.items()],
+    )
+    lines += exposition(
+        "db_statement_duration_seconds", "histogram",
+        "SQL statement latency, by engine.",
+        [((("engine", name),), h) for name, h in statement_duration.items()],
+    )
+
+    pools = pool_status()
+    for key, kind, help in (
+        ("size", "gauge", "Configured pool size."),
+        ("checked_out", "gauge", "Connections in use."),
+        ("overflow", "gauge", "Connections open beyond the pool size."),
+        ("pre_ping_failures", "counter", "Stale connections found by pre-ping."),
+    ):
+        name = f"db_pool_{key}" + ("_total" if kind == "counter" else "")
+        lines += exposition(name, kind, help, [
+            ((("engine", engine_name),), status[key]) for engine_name, status in pools.items()
+        ])
+    lines += exposition(
+        "db_pool_checkout_wait_seconds", "histogram",
+        "Time spent waiting for a pooled connection.",
+        [((("engine", "sync"),), engine.pool.checkout_wait),
+         ((("engine", "async"),), async_engine.pool.checkout_wait)],
+    )
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    lines += exposition(
+        "threadpool_in_use", "gauge",
+        "Threadpool workers running sync handlers.",
+        [((), limiter.borrowed_tokens)],
+    )
+
+    lines += exposition(
+        "bcrypt_duration_seconds", "histogram",
+        "Time to hash or verify a password, including the wait for a worker.",
+        [((), hashing.duration)],
+    )
+    lines += exposition(
+        "bcrypt_pending", "gauge",
+        "Password hashes queued or running.",
+        [((), hashing.pending())],
+    )
+    lines += exposition(
+        "bcrypt_rejected_total", "counter",
+        "Logins turned away because the bcrypt queue was full.",
+        [((), hashing.rejected)],
+    )
+
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    _check_token(request)
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
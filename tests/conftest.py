@@ -0,0 +1,119 @@
+import itertools
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+# SQLite (aiosqlite for the async engine) in a throwaway file; must be set
+# before app.database is imported
+_tmpdir = tempfile.mkdtemp(prefix="primerice-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/test.db"
+# Every request in the suite is held to its route's SQL budget
+os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.auth.utils import create_access_token  # noqa: E402
+from app.database import Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Category, Product, User  # noqa: E402
+
+Base.metadata.create_all(engine)
+
+_mobiles = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def _user(db, mobile: str, role: str) -> SimpleNamespace:
+    user = db.query(User).filter(User.mobile == mobile).first()
+    if user is None:
+        user = User(name=f"user {mobile}", mobile=mobile, password="x", role=role)
+        db.add(user)
+        db.commit()
+    token = create_access_token(user.id, user.role)
+    return SimpleNamespace(id=user.id, headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.fixture
+def admin(db):
+    return _user(db, "9000000000", "admin")
+
+
+@pytest.fixture
+def customer(db):
+    """A fresh customer per test, so carts and orders don't leak between tests."""
+    return _user(db, f"7{next(_mobiles):09d}", "user")
+
+
+@pytest.fixture
+def make_customer(db):
+    return lambda: _user(db, f"7{next(_mobiles):09d}", "user")
+
+
+@pytest.fixture(scope="session")
+def products():
+    with SessionLocal() as session:
+        category = Category(name="Rice")
+        session.add(category)
+        session.flush()
+        rows = [
+            Product(name=f"Basmati {i}", price=10 + i % 7, description="long grain", category_id=category.id)
+            for i in range(120)
+        ]
+        session.add_all(rows)
+        session.commit()
+        return [p.id for p in rows]
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements():
+    """SQL statements run on either engine while the fixture is active."""
+    counter = StatementCounter()
+    engines = (engine, async_engine.sync_engine)
+    for eng in engines:
+        event.listen(eng, "after_cursor_execute", counter)
+    yield counter
+    for eng in engines:
+        event.remove(eng, "after_cursor_execute", counter)
+
+
+@pytest.fixture
+def checkout(client):
+    """Place an order for ``customer`` through the API; returns the response body."""
+    def place(customer, product_ids, quantity=1):
+        for pid in product_ids:
+            r = client.post(f"/cart/add/{pid}", params={"quantity": quantity}, headers=customer.headers)
+            assert r.status_code == 200, r.text
+        address = client.post("/orders/address", headers=customer.headers, json={
+            "name": "Asha", "mobile": "9", "address_line": "1 Main Rd", "city": "Pune", "pincode": "411001",
+        }).json()
+        r = client.post("/orders/create", params={"address_id": address["id"]}, headers=customer.headers)
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    return place
@@ -0,0 +1,98 @@
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio.to_thread
+import pytest
+
+from app.cache import catalog_cache
+
+CONCURRENCY = 32
+
+
+@contextmanager
+def _threadpool_held(client):
+    """Shrink the app's threadpool to one worker and hold it."""
+    holder = object()
+
+    async def hold():
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        saved = limiter.total_tokens
+        limiter.total_tokens = 1
+        await limiter.acquire_on_behalf_of(holder)
+        return limiter, saved
+
+    async def release(limiter, saved):
+        limiter.release_on_behalf_of(holder)
+        limiter.total_tokens = saved
+
+    limiter, saved = client.portal.call(hold)
+    try:
+        yield limiter
+    finally:
+        client.portal.call(release, limiter, saved)
+
+
+def _burst(fn, n: int = CONCURRENCY) -> tuple[list, float]:
+    with ThreadPoolExecutor(n) as threads:
+        start = time.perf_counter()
+        futures = [threads.submit(fn, i) for i in range(n)]
+        results = [f.result(timeout=30) for f in futures]
+        return results, time.perf_counter() - start
+
+
+def test_async_routes_run_without_a_threadpool_worker(client, products, make_customer):
+    # Every worker is taken, so any handler or dependency that needs one
+    # would hang; the async catalog, cart and order paths must not.
+    # Uncompressed: a cached body's first compression is sent to a thread.
+    customers = [make_customer() for _ in range(4)]
+    identity = {"Accept-Encoding": "identity"}
+
+    def requests(i):
+        headers = {**customers[i % 4].headers, **identity}
+        return [
+            client.get("/products", params={"limit": 5, "sort": "price_asc"}, headers=identity).status_code,
+            client.get("/categories/1/products", headers=identity).status_code,
+            client.get("/cart", headers=headers).status_code,
+            client.get("/orders/my", headers=headers).status_code,
+        ]
+
+    threads = ThreadPoolExecutor(8)
+    try:
+        with _threadpool_held(client) as limiter:
+            futures = [threads.submit(requests, i) for i in range(8)]
+            results = [f.result(timeout=10) for f in futures]
+            assert limiter.borrowed_tokens == 1
+    finally:
+        threads.shutdown()
+
+    assert all(status == 200 for row in results for status in row)
+
+
+def test_concurrent_catalog_misses_share_one_load(client, products, count_statements):
+    catalog_cache.invalidate()
+    start = len(count_statements)
+
+    results, _ = _burst(lambda i: client.get("/products", params={"limit": 17}))
+
+    assert all(r.status_code == 200 for r in results)
+    assert len({r.content for r in results}) == 1
+    loads = [s for s in count_statements.statements[start:] if "from products" in s.lower()]
+    assert len(loads) == 1
+
+
+def test_async_vs_threadpool_throughput(client, products, admin, make_customer):
+    # Benchmark: uncached reads on the async cart path against the sync
+    # admin product list, both at the same concurrency
+    customers = [make_customer() for _ in range(CONCURRENCY)]
+    for c in customers:
+        assert client.post(f"/cart/add/{products[0]}", headers=c.headers).status_code == 200
+
+    cart, cart_elapsed = _burst(lambda i: client.get("/cart", headers=customers[i].headers))
+    listing, listing_elapsed = _burst(lambda i: client.get("/admin/products", headers=admin.headers))
+
+    assert all(r.status_code == 200 for r in cart + listing)
+    print(
+        f"{CONCURRENCY} concurrent requests: async GET /cart {CONCURRENCY / cart_elapsed:.0f}/s, "
+        f"threadpool GET /admin/products {CONCURRENCY / listing_elapsed:.0f}/s"
+    )
@@ -0,0 +1,52 @@
+import pytest
+
+from app.models import Cart, CartItem
+
+
+def _fill_cart(client, db, customer, product_ids):
+    client.post(f"/cart/add/{product_ids[0]}", headers=customer.headers)
+    cart = db.query(Cart).filter(Cart.user_id == customer.id).one()
+    db.add_all(CartItem(cart_id=cart.id, product_id=pid, quantity=2) for pid in product_ids[1:])
+    db.commit()
+
+
+def test_get_cart_statement_count_is_independent_of_size(client, db, customer, products, count_statements):
+    _fill_cart(client, db, customer, products[:100])
+
+    r = client.get("/cart", headers=customer.headers)
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 100
+
+    # Principal cache is warm now; what's left is the cart read itself
+    count_statements.statements.clear()
+    r = client.get("/cart", headers=customer.headers)
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 100
+    # Change stamps for the ETag, then items joined with products
+    assert len(count_statements) <= 2, count_statements.statements
+
+
+def test_cart_total_uses_current_prices(client, db, customer, products):
+    _fill_cart(client, db, customer, products[:3])
+
+    body = client.get("/cart", headers=customer.headers).json()
+    assert body["total_price"] == sum(i["product"]["price"] * i["quantity"] for i in body["items"])
+
+
+def test_add_unknown_product_is_404(client, customer, products):
+    r = client.post("/cart/add/999999", headers=customer.headers)
+    assert r.status_code == 404
+
+
+def test_add_to_cart_reraises_other_integrity_errors(client, customer, products, monkeypatch):
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+
+    from app import etags
+    from app.models import Product
+
+    # Stand in for any constraint failure other than the products FK
+    monkeypatch.setattr(etags, "bump", lambda db, scope, key=0: insert(Product).values(id=products[0], name="dup", price=1))
+
+    with pytest.raises(IntegrityError):
+        client.post(f"/cart/add/{products[0]}", headers=customer.headers)
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import event, func, select
+
+from app import sales
+from app.models import Order
+
+
+@pytest.fixture
+def loaded_orders():
+    """Order objects built from result rows while the fixture is active."""
+    loaded = []
+
+    def on_load(target, context):
+        loaded.append(target)
+
+    event.listen(Order, "load", on_load)
+    yield loaded
+    event.remove(Order, "load", on_load)
+
+
+def _touching(statements, table):
+    return [s for s in statements if table in s.lower()]
+
+
+def test_stats_is_one_aggregate_query(client, db, admin, products, checkout, make_customer, count_statements, loaded_orders):
+    for n in range(3):
+        checkout(make_customer(), products[n:n + 1])
+    start = len(count_statements)
+
+    stats = client.get("/admin/dashboard/stats", headers=admin.headers).json()
+
+    orders_sql = _touching(count_statements.statements[start:], "orders")
+    assert len(orders_sql) == 1
+    assert "sum(" in orders_sql[0].lower()
+    assert loaded_orders == []
+
+    total, count = db.execute(select(func.sum(Order.total_price), func.count(Order.id))).one()
+    assert stats["total_orders"] == count
+    assert stats["total_revenue"] == pytest.approx(total)
+    assert stats["pending_orders"] >= 3
+
+
+def test_timeseries_reads_only_the_rollup(client, db, admin, count_statements, loaded_orders):
+    sales.rebuild(db)
+    start = len(count_statements)
+
+    for granularity in ("day", "week", "month"):
+        r = client.get("/admin/dashboard/timeseries", params={"granularity": granularity}, headers=admin.headers)
+        assert r.status_code == 200
+
+    statements = count_statements.statements[start:]
+    assert len(_touching(statements, "daily_sales")) == 3
+    assert not [s for s in statements if " orders" in s.lower()]
+    assert loaded_orders == []
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import Future
+
+import pytest
+
+from app import images
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(images, "_ready", set())
+    return tmp_path
+
+
+def test_image_variants_does_not_touch_the_filesystem(upload_dir, monkeypatch):
+    (upload_dir / "abc_thumb.webp").write_bytes(b"x")
+    (upload_dir / "abc_medium.webp").write_bytes(b"x")
+    (upload_dir / "half_thumb.webp").write_bytes(b"x")
+    images._scan_ready()
+
+    def no_stat(*args):
+        raise AssertionError("filesystem checked on the request path")
+
+    monkeypatch.setattr(os.path, "exists", no_stat)
+
+    assert images.image_variants("/uploads/abc.png") == {
+        "thumb": "/uploads/abc_thumb.webp",
+        "medium": "/uploads/abc_medium.webp",
+    }
+    assert images.image_variants("/uploads/half.png") is None
+    assert images.image_variants("https://cdn.example.com/x.png") is None
+
+
+def test_finished_job_marks_variants_ready(upload_dir):
+    future = Future()
+    future.set_result(None)
+    images._variants_done(None, "fresh", future)
+
+    assert images.image_variants("/uploads/fresh.png") == {
+        "thumb": "/uploads/fresh_thumb.webp",
+        "medium": "/uploads/fresh_medium.webp",
+    }
+
+
+def test_failed_job_leaves_variants_unset(upload_dir):
+    future = Future()
+    future.set_exception(OSError("disk full"))
+    images._variants_done(None, "broken", future)
+
+    assert images.image_variants("/uploads/broken.png") is None
+
+
+def test_cache_invalidated_when_version_bump_fails(upload_dir, monkeypatch):
+    from app import etags
+
+    def fail(*args):
+        raise RuntimeError("database down")
+
+    invalidated = []
+    monkeypatch.setattr(etags, "bump", fail)
+    monkeypatch.setattr(images.catalog_cache, "invalidate", lambda: invalidated.append(True))
+
+    future = Future()
+    future.set_result(None)
+    images._variants_done(None, "fresh", future)
+
+    assert invalidated == [True]
+    assert images.image_variants("/uploads/fresh.png") is not None
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import inventory
+from app.database import ASYNC_DATABASE_URL
+from app.models import Product, ProductStockShard, StockReservation
+
+
+@pytest.fixture
+def product(db):
+    p = Product(name="Hot SKU", price=10, description="")
+    db.add(p)
+    db.commit()
+    return p
+
+
+def _available(db, product) -> int:
+    db.expire_all()
+    return inventory.stock_level(db, db.get(Product, product.id))["stock"]
+
+
+def _set_stock(client, admin, product, stock, shards=0):
+    r = client.put(f"/admin/products/{product.id}/stock", json={"stock": stock, "shards": shards}, headers=admin.headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _reserve(client, customer, product, quantity):
+    client.post(f"/cart/add/{product.id}", params={"quantity": quantity}, headers=customer.headers)
+    r = client.post("/cart/reserve", headers=customer.headers)
+    assert r.status_code == 200, r.text
+
+
+def _expire_holds(db, product):
+    db.execute(
+        update(StockReservation)
+        .where(StockReservation.product_id == product.id)
+        .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.commit()
+
+
+# ================= ADMIN STOCK vs HOLDS =================
+
+def test_set_stock_counts_held_units(client, db, admin, customer, product):
+    _set_stock(client, admin, product, 10)
+    _reserve(client, customer, product, 3)
+
+    level = _set_stock(client, admin, product, 10)
+    assert level["stock"] == 7
+    assert level["reserved"] == 3
+
+    # Releasing the holds brings it back to what the admin set, not 13
+    inventory.release_expired(db, now=datetime.utcnow() + timedelta(days=1))
+    db.commit()
+    assert _available(db, product) == 10
+
+
+def test_set_stock_below_held_drops_holds(client, db, admin, customer, product):
+    _set_stock(client, admin, product, 10)
+    _reserve(client, customer, product, 3)
+
+    level = _set_stock(client, admin, product, 2)
+    assert level == {"product_id": product.id, "stock": 2, "shards": 0, "reserved": 0}
+
+
+# ================= LAZY RELEASE =================
+
+@pytest.mark.parametrize("shards", [0, 4])
+def test_checkout_reclaims_expired_holds(client, db, admin, product, checkout, make_customer, shards):
+    _set_stock(client, admin, product, 2, shards)
+    _reserve(client, make_customer(), product, 2)
+    assert _available(db, product) == 0
+
+    _expire_holds(db, product)
+    checkout(make_customer(), [product.id])
+
+    assert _available(db, product) == 1
+    assert db.scalar(select(func.count()).where(StockReservation.product_id == product.id)) == 0
+
+
+def test_live_holds_are_not_reclaimed(client, admin, product, make_customer):
+    _set_stock(client, admin, product, 2)
+    _reserve(client, make_customer(), product, 2)
+
+    buyer = make_customer()
+    client.post(f"/cart/add/{product.id}", headers=buyer.headers)
+    r = client.post("/cart/reserve", headers=buyer.headers)
+    assert r.status_code == 409
+
+
+# ================= HOT SKU =================
+
+BUYERS = 500
+STOCK = 100
+
+
+@pytest.mark.parametrize("shards", [0, 8])
+def test_hot_sku_never_oversells(client, db, admin, product, shards):
+    """
+    500 buyers race for 100 units of one product, each in its own
+    transaction. Exactly 100 must win and stock must end at zero. Prints
+    checkouts per second; SQLite serialises writers, so the number is
+    only comparable between runs on the same machine.
+    """
+    _set_stock(client, admin, product, STOCK, shards)
+    line = SimpleNamespace(product_id=product.id, quantity=1, stock=None if shards else STOCK, stock_shards=shards or None)
+
+    # Own engine: the app's is bound to the TestClient's event loop
+    engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=10, connect_args={"timeout": 60})
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def buy(buyer: int) -> bool:
+        async with sessions() as s:
+            short = await inventory.take_for_order(s, -buyer, [line], datetime.utcnow())
+            if short:
+                await s.rollback()
+                return False
+            await s.commit()
+            return True
+
+    async def run():
+        try:
+            return await asyncio.gather(*(buy(n) for n in range(1, BUYERS + 1)))
+        finally:
+            await engine.dispose()
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert sum(results) == STOCK
+    assert _available(db, product) == 0
+    if shards:
+        assert db.scalar(
+            select(func.min(ProductStockShard.stock)).where(ProductStockShard.product_id == product.id)
+        ) == 0
+    print(f"\nhot SKU, {shards or 'no'} shards: {BUYERS} buyers in {elapsed:.2f}s ({BUYERS / elapsed:.0f}/s)")
@@ -0,0 +1,35 @@
+import pytest
+
+from app.pagination import encode_cursor
+
+
+@pytest.mark.parametrize("cursor", [encode_cursor("abc"), encode_cursor({}), encode_cursor(True), "not-base64!"])
+def test_admin_orders_rejects_malformed_cursor(client, admin, cursor):
+    for path in ("/admin/orders", "/orders/all"):
+        r = client.get(path, params={"cursor": cursor}, headers=admin.headers)
+        assert r.status_code == 400, (path, r.text)
+
+
+@pytest.mark.parametrize("sort,cursor", [
+    ("newest", encode_cursor("x")),
+    ("newest", encode_cursor(1, 2)),
+    ("price_asc", encode_cursor("x", {})),
+    ("price_asc", encode_cursor(10.0, "7")),
+    ("price_desc", encode_cursor(None, 3)),
+])
+def test_products_reject_mistyped_cursor(client, products, sort, cursor):
+    r = client.get("/products", params={"sort": sort, "cursor": cursor})
+    assert r.status_code == 400
+    assert client.get("/categories/1/products", params={"sort": sort, "cursor": cursor}).status_code == 400
+
+
+def test_search_rejects_negative_or_mistyped_offset(client, products):
+    for cursor in (encode_cursor(-20), encode_cursor("20"), encode_cursor(2.5)):
+        assert client.get("/products/search", params={"q": "basmati", "cursor": cursor}).status_code == 400
+
+
+def test_products_cursor_round_trip(client, products):
+    first = client.get("/products", params={"sort": "price_asc", "limit": 5}).json()
+    second = client.get("/products", params={"sort": "price_asc", "limit": 5, "cursor": first["next_cursor"]}).json()
+    assert second["items"]
+    assert {p["id"] for p in first["items"]}.isdisjoint(p["id"] for p in second["items"])
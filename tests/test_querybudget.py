@@ -0,0 +1,112 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from app import querybudget
+from app.database import SessionLocal, get_db
+from app.models import Category, Product
+from app.querybudget import QueryBudgetExceeded, QueryBudgetMiddleware, query_budget
+from app.telemetry import MetricsMiddleware
+
+# A separate app with deliberately bad endpoints, behind the same two
+# middlewares as app.main
+
+bad = FastAPI()
+
+
+@bad.get("/lazy")
+def lazy(db=Depends(get_db)):
+    # One category SELECT per product: the classic N+1
+    products = db.scalars(select(Product).where(Product.name.like("Lazy %"))).all()
+    return [p.category.name for p in products]
+
+
+@bad.get("/eager")
+def eager(db=Depends(get_db)):
+    return db.scalars(select(Product.name).where(Product.name.like("Lazy %"))).all()
+
+
+@bad.get("/over", dependencies=[query_budget(1)])
+def over(db=Depends(get_db)):
+    db.execute(select(Product.id).limit(1))
+    db.execute(select(Category.id).limit(1))
+    return "ok"
+
+
+@bad.get("/writes")
+def writes(db=Depends(get_db)):
+    # Same UPDATE per row is deliberate (stock is taken this way)
+    for n in range(10):
+        db.execute(update(Product).where(Product.name == f"Lazy {n}").values(price=Product.price))
+    db.rollback()
+    return "ok"
+
+
+@bad.get("/lifted", dependencies=[query_budget(None, repeats=None)])
+def lifted(db=Depends(get_db)):
+    return lazy(db)
+
+
+bad.add_middleware(QueryBudgetMiddleware)
+bad.add_middleware(MetricsMiddleware)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with SessionLocal() as db:
+        for n in range(10):
+            category = Category(name=f"Lazy category {n}")
+            db.add(category)
+            db.flush()
+            db.add(Product(name=f"Lazy {n}", price=10, category_id=category.id))
+        db.commit()
+
+    with TestClient(bad) as c:
+        yield c
+
+
+def test_suite_runs_in_raise_mode():
+    assert querybudget.QUERY_BUDGET_MODE == "raise"
+
+
+def test_repeated_select_raises(client):
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        client.get("/lazy")
+
+
+def test_same_data_without_lazy_loads_passes(client):
+    assert len(client.get("/eager").json()) == 10
+
+
+def test_statement_budget_raises(client):
+    with pytest.raises(QueryBudgetExceeded, match="budget is 1"):
+        client.get("/over")
+
+
+def test_repeated_writes_are_allowed(client):
+    assert client.get("/writes").status_code == 200
+
+
+def test_lifted_limits_allow_repeats(client):
+    assert client.get("/lifted").status_code == 200
+
+
+def test_header_mode_reports_counts(client, monkeypatch):
+    monkeypatch.setattr(querybudget, "QUERY_BUDGET_MODE", "header")
+
+    r = client.get("/lazy")
+    assert r.status_code == 200
+    assert int(r.headers["X-Query-Count"]) == 11
+    assert int(r.headers["X-Query-Max-Repeat"]) == 10
+
+    r = client.get("/over")
+    assert r.headers["X-Query-Count"] == "2"
+    assert r.headers["X-Query-Budget"] == "1"
+
+
+def test_log_mode_warns(client, monkeypatch, caplog):
+    monkeypatch.setattr(querybudget, "QUERY_BUDGET_MODE", "log")
+
+    assert client.get("/lazy").status_code == 200
+    assert "GET /lazy ran 11 SQL statements" in caplog.text
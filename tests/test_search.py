@@ -0,0 +1,47 @@
+import time
+
+from app import cache, search
+from app.cache import catalog_cache, search_cache
+
+
+def test_distinct_queries_do_not_evict_listings(client, products):
+    client.get("/products", params={"limit": 7})
+    listings = len(catalog_cache._entries)
+
+    for i in range(cache.SEARCH_CACHE_SIZE * 2):
+        assert client.get("/products/search", params={"q": f"basmati {i}"}).status_code == 200
+
+    assert len(catalog_cache._entries) == listings
+    assert len(search_cache._entries) <= cache.SEARCH_CACHE_SIZE
+
+
+def test_catalog_write_retires_cached_searches(client, products, monkeypatch):
+    calls = []
+    real = search.search
+
+    async def counting(*args):
+        calls.append(args[1])
+        return await real(*args)
+
+    monkeypatch.setattr(search, "search", counting)
+    client.get("/products/search", params={"q": "long grain"})
+    client.get("/products/search", params={"q": "long grain"})
+    assert len(calls) == 1
+
+    catalog_cache.invalidate()
+    client.get("/products/search", params={"q": "long grain"})
+    assert len(calls) == 2
+
+
+def test_search_latency(client, products):
+    # Uncached: every query is new, so each one reaches the database
+    timings = []
+    for i in range(200):
+        start = time.perf_counter()
+        r = client.get("/products/search", params={"q": f"basmati {i} grain"})
+        timings.append(time.perf_counter() - start)
+        assert r.status_code == 200
+    timings.sort()
+    p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+    print(f"search uncached p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms")
+    assert p99 < 0.5